@@ -1,18 +1,84 @@
 from flask import Flask, jsonify
-from flask_cors import CORS
-from sqlalchemy import text
+from sqlalchemy import event, text
 
 from .config import Config
 from .extensions import db
+from .json_provider import OrjsonProvider
 from .routes.api import api_bp
 
 
+# Bump whenever the startup SQLite fixups below change (new indexes, rebuilds).
+SQLITE_SCHEMA_VERSION = "2"
+
+
+class _ApiPrefixMiddleware:
+    """Serve the legacy un-prefixed API paths from the single /api registration."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if path != "/" and path != "/api" and not path.startswith("/api/"):
+            environ["PATH_INFO"] = "/api" + path
+        return self.wsgi_app(environ, start_response)
+
+
+def _set_sqlite_pragmas(dbapi_conn, _connection_record):
+    # WAL lets readers run alongside the sync writer; the rest trades
+    # durability on power loss for fewer fsyncs and a larger page cache.
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+# Runs as one script in one explicit transaction, so the copy is all-or-nothing.
+_REBUILD_ORG_MAPPING_SQL = """
+BEGIN;
+DROP TABLE IF EXISTS org_mapping_new;
+CREATE TABLE org_mapping_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    global_org_id INTEGER NOT NULL,
+    instance_org_id INTEGER,
+    instance_org_name VARCHAR(255) NOT NULL,
+    instance_org_acronym VARCHAR(50),
+    instance_org_type VARCHAR(255) NOT NULL,
+    parent_instance_org_id INTEGER,
+    fund_name VARCHAR(255),
+    fund_id INTEGER,
+    match_percent DECIMAL(5, 2),
+    risk_level VARCHAR(10),
+    status VARCHAR(20),
+    created_at DATETIME,
+    updated_at DATETIME
+);
+INSERT INTO org_mapping_new (
+    id, global_org_id, instance_org_id, instance_org_name, instance_org_acronym,
+    instance_org_type, parent_instance_org_id, fund_name, fund_id, match_percent,
+    risk_level, status, created_at, updated_at
+)
+SELECT
+    id, global_org_id, instance_org_id, instance_org_name, instance_org_acronym,
+    instance_org_type, parent_instance_org_id, fund_name, fund_id, match_percent,
+    risk_level, status, created_at, updated_at
+FROM org_mapping;
+DROP TABLE org_mapping;
+ALTER TABLE org_mapping_new RENAME TO org_mapping;
+COMMIT;
+"""
+
+
 def _ensure_sqlite_org_mapping_schema():
     """
     Ensure org_mapping.id is INTEGER PRIMARY KEY AUTOINCREMENT in SQLite.
     Older schema used BIGINT, which breaks auto-increment inserts on SQLite.
     """
-    with db.engine.begin() as conn:
+    with db.engine.connect() as conn:
         table_rows = conn.execute(
             text("SELECT name FROM sqlite_master WHERE type='table' AND name='org_mapping'")
         ).fetchall()
@@ -27,66 +93,91 @@ def _ensure_sqlite_org_mapping_schema():
         id_type = str(id_row[2]).upper()
         if id_type == "INTEGER":
             return
+        conn.rollback()
 
-        conn.execute(text("DROP TABLE IF EXISTS org_mapping_new"))
-        conn.execute(
-            text(
-                """
-                CREATE TABLE org_mapping_new (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    global_org_id INTEGER NOT NULL,
-                    instance_org_id INTEGER,
-                    instance_org_name VARCHAR(255) NOT NULL,
-                    instance_org_acronym VARCHAR(50),
-                    instance_org_type VARCHAR(255) NOT NULL,
-                    parent_instance_org_id INTEGER,
-                    fund_name VARCHAR(255),
-                    fund_id INTEGER,
-                    match_percent DECIMAL(5, 2),
-                    risk_level VARCHAR(10),
-                    status VARCHAR(20),
-                    created_at DATETIME,
-                    updated_at DATETIME
-                )
-                """
-            )
-        )
+        # Full-rebuild window: keep the rollback journal in memory, skip fsyncs
+        # and FK checks while rows are copied, then restore the previous values.
+        saved_pragmas = {
+            name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in ("journal_mode", "synchronous", "foreign_keys")
+        }
+        conn.exec_driver_sql("PRAGMA journal_mode=MEMORY")
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        conn.commit()
+        raw_conn = conn.connection.driver_connection
+        try:
+            raw_conn.executescript(_REBUILD_ORG_MAPPING_SQL)
+        except Exception:
+            if raw_conn.in_transaction:
+                raw_conn.rollback()
+            raise
+        finally:
+            for name, value in saved_pragmas.items():
+                conn.exec_driver_sql(f"PRAGMA {name}={value}")
+            conn.commit()
+
+
+def _ensure_sqlite_indexes():
+    """
+    create_all() skips tables that already exist, so indexes added to a model
+    later (or lost in the org_mapping rebuild) are created here. ix_* indexes
+    no longer declared on the model are dropped.
+    """
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            declared = {index.name for index in table.indexes}
+            existing = conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name=:table"),
+                {"table": table.name},
+            ).scalars().all()
+            for name in existing:
+                if name.startswith("ix_") and name not in declared:
+                    conn.execute(text(f'DROP INDEX "{name}"'))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+def _sqlite_schema_is_current() -> bool:
+    with db.engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS _meta (key TEXT PRIMARY KEY, value TEXT)"))
+        row = conn.execute(text("SELECT value FROM _meta WHERE key = 'schema_version'")).fetchone()
+    return bool(row) and row[0] == SQLITE_SCHEMA_VERSION
+
+
+def _mark_sqlite_schema_current():
+    with db.engine.begin() as conn:
         conn.execute(
-            text(
-                """
-                INSERT INTO org_mapping_new (
-                    id, global_org_id, instance_org_id, instance_org_name, instance_org_acronym,
-                    instance_org_type, parent_instance_org_id, fund_name, fund_id, match_percent,
-                    risk_level, status, created_at, updated_at
-                )
-                SELECT
-                    id, global_org_id, instance_org_id, instance_org_name, instance_org_acronym,
-                    instance_org_type, parent_instance_org_id, fund_name, fund_id, match_percent,
-                    risk_level, status, created_at, updated_at
-                FROM org_mapping
-                """
-            )
+            text("INSERT OR REPLACE INTO _meta (key, value) VALUES ('schema_version', :version)"),
+            {"version": SQLITE_SCHEMA_VERSION},
         )
-        conn.execute(text("DROP TABLE org_mapping"))
-        conn.execute(text("ALTER TABLE org_mapping_new RENAME TO org_mapping"))
 
 
 def create_app() -> Flask:
     app = Flask(__name__)
-    app.config.from_object(Config())
+    app.config.from_object(Config.get())
+    app.json = OrjsonProvider(app)
 
     db.init_app(app)
     with app.app_context():
-        if app.config.get("AUTO_CREATE_TABLES", True) and str(app.config.get("SQLALCHEMY_DATABASE_URI", "")).startswith("sqlite"):
+        is_sqlite = str(app.config.get("SQLALCHEMY_DATABASE_URI", "")).startswith("sqlite")
+        if is_sqlite:
+            event.listen(db.engine, "connect", _set_sqlite_pragmas)
+        if app.config.get("AUTO_CREATE_TABLES", True) and is_sqlite:
             db.create_all()
-            _ensure_sqlite_org_mapping_schema()
+            if not _sqlite_schema_is_current():
+                _ensure_sqlite_org_mapping_schema()
+                _ensure_sqlite_indexes()
+                _mark_sqlite_schema_current()
+
+    from flask_cors import CORS
 
-    CORS(app, resources={r"/*": {"origins": app.config["CORS_ALLOWED_ORIGINS"]}})
+    CORS(app, resources={r"/*": {"origins": app.config["CORS_ORIGINS_RE"] or app.config["CORS_ALLOWED_ORIGINS"]}})
 
     @app.get("/")
     def healthcheck():
         return jsonify({"status": "ok", "service": "gomapping-backend-flask"})
 
-    app.register_blueprint(api_bp, url_prefix="")
-    app.register_blueprint(api_bp, url_prefix="/api", name="api_prefixed")
+    app.register_blueprint(api_bp, url_prefix="/api")
+    app.wsgi_app = _ApiPrefixMiddleware(app.wsgi_app)
     return app
@@ -1,25 +1,83 @@
+import heapq
+import threading
 import time
+from collections import OrderedDict
 
 
 class TTLCache:
-    def __init__(self):
-        self._store = {}
+    def __init__(self, max_size: int = 10_000):
+        self.max_size = max_size
+        self._store = OrderedDict()
+        self._heap = []
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _purge_expired(self, now):
+        # Dead entries (overwritten or removed keys) linger until the next
+        # compaction; skip any whose expiry no longer matches the live entry.
+        while self._heap and self._heap[0][0] < now:
+            expires_at, key = heapq.heappop(self._heap)
+            item = self._store.get(key)
+            if item and item[1] == expires_at:
+                del self._store[key]
+
+    def _compact_heap(self):
+        # Drop heap entries left behind by overwritten or evicted keys, so the
+        # heap stays proportional to the live entries rather than to set() calls.
+        store = self._store
+        self._heap = [
+            (expires_at, key)
+            for expires_at, key in self._heap
+            if key in store and store[key][1] == expires_at
+        ]
+        heapq.heapify(self._heap)
+
+    def _remove(self, key):
+        # Every removal path goes through here; once dead heap entries outnumber
+        # the live ones, compact so the heap tracks _store instead of history.
+        self._store.pop(key, None)
+        if len(self._heap) > 2 * len(self._store) + 32:
+            self._compact_heap()
 
     def get(self, key):
-        item = self._store.get(key)
-        if not item:
-            return None
-        value, expires_at = item
-        if expires_at < time.time():
-            self._store.pop(key, None)
-            return None
-        return value
+        with self._lock:
+            item = self._store.get(key)
+            if not item:
+                self._misses += 1
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic_ns():
+                self._remove(key)
+                self._misses += 1
+                return None
+            self._store.move_to_end(key)
+            self._hits += 1
+            return value
 
     def set(self, key, value, ttl_seconds: int):
-        self._store[key] = (value, time.time() + ttl_seconds)
+        now = time.monotonic_ns()
+        expires_at = now + int(ttl_seconds * 1_000_000_000)
+        with self._lock:
+            self._store[key] = (value, expires_at)
+            self._store.move_to_end(key)
+            heapq.heappush(self._heap, (expires_at, key))
+            # Expired entries go first; only then fall back to LRU eviction.
+            self._purge_expired(now)
+            while len(self._store) > self.max_size:
+                self._remove(next(iter(self._store)))
+                self._evictions += 1
+            if len(self._heap) > 2 * self.max_size:
+                self._compact_heap()
 
     def delete(self, key):
-        self._store.pop(key, None)
+        with self._lock:
+            self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "evictions": self._evictions}
 
 
 cache = TTLCache()
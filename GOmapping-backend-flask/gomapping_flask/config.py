@@ -1,9 +1,36 @@
 import os
+import re
 from pathlib import Path
-from urllib.parse import quote_plus
+
+
+def _mssql_uri() -> str:
+    # Only the mssql engine needs URL quoting, so keep its import here.
+    from urllib.parse import quote_plus
+
+    db_name = os.getenv("DB_NAME", "gomapping")
+    db_user = os.getenv("DB_USER", "demo")
+    db_password = os.getenv("DB_PASSWORD", "Ocha19911219!")
+    db_host = os.getenv("DB_HOST", r"OCHAL25109748\SQLEXPRESS")
+    odbc_driver = os.getenv("ODBC_DRIVER", "ODBC Driver 17 for SQL Server")
+    trust_cert = os.getenv("DB_TRUST_CERT", "yes")
+    driver_q = quote_plus(odbc_driver)
+    password_q = quote_plus(db_password)
+    return (
+        f"mssql+pyodbc://{db_user}:{password_q}@{db_host}/{db_name}"
+        f"?driver={driver_q}&TrustServerCertificate={trust_cert}"
+    )
 
 
 class Config:
+    _instance = None
+
+    @classmethod
+    def get(cls) -> "Config":
+        """Return the process-wide config, reading the environment only once."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
     def __init__(self) -> None:
         debug_raw = os.getenv("FLASK_DEBUG", "true").lower()
         self.DEBUG = debug_raw in {"1", "true", "yes", "on"}
@@ -23,22 +50,25 @@ class Config:
                         sqlite_path = (Path.cwd() / sqlite_path).resolve()
                     self.SQLALCHEMY_DATABASE_URI = f"sqlite:///{sqlite_path.as_posix()}"
             elif db_engine == "mssql":
-                db_name = os.getenv("DB_NAME", "gomapping")
-                db_user = os.getenv("DB_USER", "demo")
-                db_password = os.getenv("DB_PASSWORD", "Ocha19911219!")
-                db_host = os.getenv("DB_HOST", r"OCHAL25109748\SQLEXPRESS")
-                odbc_driver = os.getenv("ODBC_DRIVER", "ODBC Driver 17 for SQL Server")
-                trust_cert = os.getenv("DB_TRUST_CERT", "yes")
-                driver_q = quote_plus(odbc_driver)
-                password_q = quote_plus(db_password)
-                self.SQLALCHEMY_DATABASE_URI = (
-                    f"mssql+pyodbc://{db_user}:{password_q}@{db_host}/{db_name}"
-                    f"?driver={driver_q}&TrustServerCertificate={trust_cert}"
-                )
+                self.SQLALCHEMY_DATABASE_URI = _mssql_uri()
             else:
                 raise ValueError("Unsupported DB_ENGINE. Use 'sqlite' or 'mssql'.")
 
         self.SQLALCHEMY_TRACK_MODIFICATIONS = False
+        if not self.SQLALCHEMY_DATABASE_URI.startswith("sqlite"):
+            # SQLite keeps SQLAlchemy's default pool; server databases get a larger
+            # LIFO pool so a warm subset of connections handles most requests.
+            self.SQLALCHEMY_ENGINE_OPTIONS = {
+                "pool_size": int(os.getenv("DB_POOL_SIZE", "25")),
+                "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+                "pool_pre_ping": True,
+                "pool_recycle": 1800,
+                "pool_use_lifo": True,
+            }
+            if self.SQLALCHEMY_DATABASE_URI.startswith("mssql+pyodbc"):
+                # Send executemany batches (similarity rebuilds, sync upserts)
+                # as one parameter array instead of one round trip per row.
+                self.SQLALCHEMY_ENGINE_OPTIONS["fast_executemany"] = True
         auto_create_raw = os.getenv("AUTO_CREATE_TABLES", "true").lower()
         self.AUTO_CREATE_TABLES = auto_create_raw in {"1", "true", "yes", "on"}
 
@@ -48,6 +78,12 @@ class Config:
             if cors_origins != "*"
             else "*"
         )
+        # One anchored alternation so flask-cors matches an origin in a single pass.
+        self.CORS_ORIGINS_RE = (
+            re.compile("^(?:" + "|".join(map(re.escape, self.CORS_ALLOWED_ORIGINS)) + ")$")
+            if isinstance(self.CORS_ALLOWED_ORIGINS, list)
+            else None
+        )
 
         # Azure OpenAI configuration
         self.AZURE_OPENAI_ENDPOINT = os.getenv(
@@ -65,4 +101,10 @@ class Config:
         )
         # Use your Azure deployment name here.
         self.AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4.1")
+        self.AZURE_OPENAI_TIMEOUT_SECONDS = float(os.getenv("AZURE_OPENAI_TIMEOUT_SECONDS", "60"))
         self.CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "3600"))
+
+        # String similarity used for org_mapping.match_percent during data sync.
+        self.MATCH_SCORER = os.getenv("MATCH_SCORER", "ratio").lower()
+        if self.MATCH_SCORER not in {"ratio", "jaro_winkler"}:
+            raise ValueError("Unsupported MATCH_SCORER. Use 'ratio' or 'jaro_winkler'.")
@@ -0,0 +1,28 @@
+import orjson
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson. Types orjson does not encode the same
+    way as Flask (Decimal, datetime as HTTP date, ...) go through Flask's encoder.
+    """
+
+    option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps_bytes(self, obj, option: int = 0) -> bytes:
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=self.option | option)
+
+    def dumps(self, obj, **kwargs) -> str:
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Match Flask's default provider: trailing newline, pretty-print in debug mode.
+        option = orjson.OPT_APPEND_NEWLINE
+        if self._app.debug:
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(self.dumps_bytes(obj, option), mimetype="application/json")
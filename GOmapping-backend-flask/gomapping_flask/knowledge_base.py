@@ -1,115 +1,157 @@
 import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+
+class KBEntry(NamedTuple):
+    standard_name: str
+    acronym: str
+    countries: tuple
+    priority: int
 
 
 KNOWN_ORGANIZATIONS = {
-    "save the children": {
-        "standard_name": "Save the Children International",
-        "acronym": "SC",
-        "countries": ["UK", "USA", "Jordan", "Syria", "Ethiopia", "Somalia", "Afghanistan"],
-        "priority": 10,
-    },
-    "international rescue committee": {
-        "standard_name": "International Rescue Committee",
-        "acronym": "IRC",
-        "countries": ["Yemen", "Jordan", "Syria", "Somalia", "Afghanistan"],
-        "priority": 9,
-    },
-    "oxfam": {
-        "standard_name": "Oxfam International",
-        "acronym": "OXFAM",
-        "countries": ["GB", "America", "International"],
-        "priority": 9,
-    },
-    "care": {
-        "standard_name": "CARE International",
-        "acronym": "CARE",
-        "countries": ["International", "USA", "UK"],
-        "priority": 9,
-    },
-    "world vision": {
-        "standard_name": "World Vision International",
-        "acronym": "WVI",
-        "countries": ["International", "USA"],
-        "priority": 9,
-    },
-    "unicef": {
-        "standard_name": "United Nations Children's Fund",
-        "acronym": "UNICEF",
-        "countries": ["Global"],
-        "priority": 10,
-    },
-    "unhcr": {
-        "standard_name": "United Nations High Commissioner for Refugees",
-        "acronym": "UNHCR",
-        "countries": ["Global"],
-        "priority": 10,
-    },
-    "wfp": {
-        "standard_name": "World Food Programme",
-        "acronym": "WFP",
-        "countries": ["Global"],
-        "priority": 10,
-    },
+    "save the children": KBEntry(
+        standard_name="Save the Children International",
+        acronym="SC",
+        countries=("UK", "USA", "Jordan", "Syria", "Ethiopia", "Somalia", "Afghanistan"),
+        priority=10,
+    ),
+    "international rescue committee": KBEntry(
+        standard_name="International Rescue Committee",
+        acronym="IRC",
+        countries=("Yemen", "Jordan", "Syria", "Somalia", "Afghanistan"),
+        priority=9,
+    ),
+    "oxfam": KBEntry(
+        standard_name="Oxfam International",
+        acronym="OXFAM",
+        countries=("GB", "America", "International"),
+        priority=9,
+    ),
+    "care": KBEntry(
+        standard_name="CARE International",
+        acronym="CARE",
+        countries=("International", "USA", "UK"),
+        priority=9,
+    ),
+    "world vision": KBEntry(
+        standard_name="World Vision International",
+        acronym="WVI",
+        countries=("International", "USA"),
+        priority=9,
+    ),
+    "unicef": KBEntry(
+        standard_name="United Nations Children's Fund",
+        acronym="UNICEF",
+        countries=("Global",),
+        priority=10,
+    ),
+    "unhcr": KBEntry(
+        standard_name="United Nations High Commissioner for Refugees",
+        acronym="UNHCR",
+        countries=("Global",),
+        priority=10,
+    ),
+    "wfp": KBEntry(
+        standard_name="World Food Programme",
+        acronym="WFP",
+        countries=("Global",),
+        priority=10,
+    ),
 }
 
 
+_PUNCT_RE = re.compile(r"[^\w\s]")
+# ASCII-only equivalent of _PUNCT_RE for str.translate; "_" counts as \w and is kept.
+_PUNCT_TABLE = str.maketrans({c: " " for c in map(chr, range(128)) if _PUNCT_RE.match(c)})
+_STOP_WORDS = frozenset({"the", "of", "for", "and", "in", "to", "a", "an"})
+_SUFFIXES = (
+    "international",
+    "uk",
+    "usa",
+    "jordan",
+    "yemen",
+    "somalia",
+    "ethiopia",
+    "syria",
+    "lebanon",
+    "iraq",
+    "afghanistan",
+    "sudan",
+    "pakistan",
+)
+# Longest alternatives first so the regex never stops on a shorter suffix.
+_SUFFIX_RE = re.compile(
+    r" (?:" + "|".join(map(re.escape, sorted(_SUFFIXES, key=len, reverse=True))) + r")$"
+)
+
+
 def normalize_for_kb(name: str) -> str:
     if not name:
         return ""
     text = name.lower()
-    text = re.sub(r"[^\w\s]", " ", text)
-    stop_words = {"the", "of", "for", "and", "in", "to", "a", "an"}
-    words = [w for w in text.split() if w not in stop_words]
-    text = " ".join(words)
-    suffixes = [
-        "international",
-        "uk",
-        "usa",
-        "jordan",
-        "yemen",
-        "somalia",
-        "ethiopia",
-        "syria",
-        "lebanon",
-        "iraq",
-        "afghanistan",
-        "sudan",
-        "pakistan",
-    ]
-    for suffix in suffixes:
-        if text.endswith(" " + suffix):
-            text = text[: -len(" " + suffix)]
-            break
-    return text.strip()
+    text = text.translate(_PUNCT_TABLE) if text.isascii() else _PUNCT_RE.sub(" ", text)
+    text = " ".join(w for w in text.split() if w not in _STOP_WORDS)
+    return _SUFFIX_RE.sub("", text, count=1).strip()
+
+
+# Keys as they come out of normalize_for_kb, so entries such as
+# "save the children" (stored with a stop word) can still hit exactly.
+_NORMALIZED_KB = {
+    normalize_for_kb(key) or key: item for key, item in KNOWN_ORGANIZATIONS.items()
+}
 
+# Cheap rejection for both substring directions; normalized names never contain "\n".
+_KB_KEY_RE = re.compile("|".join(map(re.escape, _NORMALIZED_KB)))
+_KB_KEY_BLOB = "\n".join(_NORMALIZED_KB)
 
+
+@lru_cache(maxsize=4096)
 def find_standard_name(org_name: str):
     if not org_name:
         return None, 0, False
     normalized = normalize_for_kb(org_name)
-    if normalized in KNOWN_ORGANIZATIONS:
-        item = KNOWN_ORGANIZATIONS[normalized]
-        return item["standard_name"], item.get("priority", 0), True
+    item = _NORMALIZED_KB.get(normalized)
+    if item is not None:
+        return item.standard_name, item.priority, True
+
+    if not _KB_KEY_RE.search(normalized) and normalized not in _KB_KEY_BLOB:
+        return None, 0, False
 
-    for key, item in KNOWN_ORGANIZATIONS.items():
+    # Some key matches; walk in declaration order so precedence is unchanged.
+    for key, item in _NORMALIZED_KB.items():
         if key in normalized or normalized in key:
-            return item["standard_name"], item.get("priority", 0), True
+            return item.standard_name, item.priority, True
 
     return None, 0, False
 
 
-def get_recommendation_score(org_name: str, usage_count: int):
+@dataclass(frozen=True, slots=True)
+class RecommendationScore:
+    score: float
+    kb_match: bool
+    standard_name: Optional[str]
+    kb_priority: int
+    usage_count: int
+    name_length: int
+
+
+@lru_cache(maxsize=4096)
+def get_recommendation_score(org_name: str, usage_count: int) -> RecommendationScore:
     standard_name, kb_priority, kb_match = find_standard_name(org_name)
     kb_score = kb_priority * 4 if kb_match else 0
     usage_score = min((usage_count or 0) * 4, 40)
     name_len = len(org_name or "")
     completeness_score = min(name_len / 2, 20)
     total = kb_score + usage_score + completeness_score
-    return {
-        "score": total,
-        "kb_match": kb_match,
-        "standard_name": standard_name,
-        "kb_priority": kb_priority,
-        "usage_count": usage_count or 0,
-        "name_length": name_len,
-    }
+    return RecommendationScore(
+        score=total,
+        kb_match=kb_match,
+        standard_name=standard_name,
+        kb_priority=kb_priority,
+        usage_count=usage_count or 0,
+        name_length=name_len,
+    )
+
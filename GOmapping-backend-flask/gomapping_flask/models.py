@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import DECIMAL, Index
+from sqlalchemy import DECIMAL, Index, text
 
 from .extensions import db
 
@@ -16,6 +16,14 @@ class GlobalOrganization(db.Model):
 
 class GoSimilarity(db.Model):
     __tablename__ = "go_similarity"
+    __table_args__ = (
+        Index(
+            "ix_go_similarity_source_similarity_target",
+            "source_global_org_id",
+            text("similarity_percent DESC"),
+            "target_global_org_id",
+        ),
+    )
 
     source_global_org_id = db.Column(db.Integer, primary_key=True)
     target_global_org_id = db.Column(db.Integer, primary_key=True)
@@ -24,6 +32,10 @@ class GoSimilarity(db.Model):
 
 class OrgMapping(db.Model):
     __tablename__ = "org_mapping"
+    __table_args__ = (
+        Index("ix_org_mapping_global_org_id_id", "global_org_id", "id"),
+        Index("ix_org_mapping_instance_org_id_fund_id_global_org_id", "instance_org_id", "fund_id", "global_org_id"),
+    )
 
     # Use INTEGER PK for SQLite autoincrement compatibility.
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -73,7 +85,7 @@ class DataSyncLog(db.Model):
 class MergeDecision(db.Model):
     __tablename__ = "merge_decisions"
     __table_args__ = (
-        Index("ix_merge_decisions_instance_org_id", "instance_org_id"),
+        Index("ix_merge_decisions_instance_org_id_execution_status", "instance_org_id", "execution_status"),
         Index("ix_merge_decisions_original_global_org_id", "original_global_org_id"),
         Index("ix_merge_decisions_target_global_org_id", "target_global_org_id"),
         Index("ix_merge_decisions_execution_status", "execution_status"),
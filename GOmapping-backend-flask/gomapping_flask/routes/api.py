@@ -1,24 +1,42 @@
 import ast
-import json
+import hashlib
 import re
 from datetime import datetime
+from functools import lru_cache
 
-from flask import Blueprint, current_app, jsonify, request
-from sqlalchemy import and_
+import orjson
+from flask import Blueprint, current_app, jsonify, request, stream_with_context
+from sqlalchemy import and_, update
 
 from ..cache import cache
 from ..extensions import db
 from ..models import GlobalOrganization, GoSimilarity, MergeDecision, OrgMapping
 from ..services.similarity import (
     build_go_summary_response,
-    recalculate_similarity_table,
-    refresh_usage_counts,
+    recompute_similarity,
+    start_background_recompute,
 )
 from ..services.sync_data import get_sync_service
 
 
 api_bp = Blueprint("api", __name__)
 
+# Mapping fields shared by org_mappings and the dashboard; read as plain rows, not ORM objects.
+_MAPPING_COLUMNS = (
+    OrgMapping.instance_org_id,
+    OrgMapping.instance_org_name,
+    OrgMapping.instance_org_acronym,
+    OrgMapping.instance_org_type,
+    OrgMapping.parent_instance_org_id,
+    OrgMapping.fund_id,
+    OrgMapping.fund_name,
+    OrgMapping.match_percent,
+    OrgMapping.risk_level,
+    OrgMapping.status,
+)
+
+_FENCED_JSON_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL | re.IGNORECASE)
+
 
 def _json_error(message, code=400, **extra):
     payload = {"error": message}
@@ -26,6 +44,17 @@ def _json_error(message, code=400, **extra):
     return jsonify(payload), code
 
 
+def _body_etag(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _conditional_json(body, etag):
+    # 304 with no body when the client's If-None-Match already has this payload.
+    response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
 @api_bp.get("/go-summary/")
 def go_summary():
     force_refresh = request.args.get("refresh", "").lower() == "true"
@@ -39,16 +68,33 @@ def go_summary():
     if not force_refresh:
         cached = cache.get(cache_key)
         if cached:
-            return jsonify(cached)
+            return _conditional_json(*cached)
+
+    if force_refresh and request.args.get("background", "").lower() == "true":
+        # Opt-in: recompute off the request thread; the current cache keeps serving reads.
+        started = start_background_recompute(
+            current_app._get_current_object(), threshold, on_complete=_after_similarity_recompute
+        )
+        return jsonify({"status": "started" if started else "already_running"}), 202
 
     if force_refresh:
-        refresh_usage_counts()
-        recalculate_similarity_table(threshold=threshold)
+        recompute_similarity(threshold=threshold)
         cache.delete("mapping_dashboard_data")
 
-    data = build_go_summary_response()
-    cache.set(cache_key, data, current_app.config["CACHE_TTL_SECONDS"])
-    return jsonify(data)
+    return _conditional_json(*_cache_go_summary_body())
+
+
+def _cache_go_summary_body():
+    # Cache the encoded body (and its ETag) so hits skip serialization entirely.
+    body = current_app.json.dumps_bytes(build_go_summary_response(), orjson.OPT_APPEND_NEWLINE)
+    entry = (body, _body_etag(body))
+    cache.set("go_summary_data", entry, current_app.config["CACHE_TTL_SECONDS"])
+    return entry
+
+
+def _after_similarity_recompute():
+    cache.delete("mapping_dashboard_data")
+    _cache_go_summary_body()
 
 
 @api_bp.get("/go-detail/<int:go_id>/")
@@ -57,29 +103,32 @@ def go_detail(go_id):
     if not go:
         return _json_error("Global organization not found", 404)
 
-    similarities = (
-        GoSimilarity.query.filter_by(source_global_org_id=go_id)
+    # Inner join drops similarity rows whose target GO no longer exists.
+    rows = (
+        db.session.query(
+            GoSimilarity.similarity_percent,
+            GlobalOrganization.global_org_id,
+            GlobalOrganization.global_org_name,
+            GlobalOrganization.usage_count,
+        )
+        .join(GlobalOrganization, GlobalOrganization.global_org_id == GoSimilarity.target_global_org_id)
+        .filter(GoSimilarity.source_global_org_id == go_id)
         .order_by(GoSimilarity.similarity_percent.desc(), GoSimilarity.target_global_org_id.asc())
         .all()
     )
-    target_ids = [s.target_global_org_id for s in similarities]
-    targets = {x.global_org_id: x for x in GlobalOrganization.query.filter(GlobalOrganization.global_org_id.in_(target_ids)).all()}
-
-    similar_gos = []
-    for s in similarities:
-        tgt = targets.get(s.target_global_org_id)
-        if not tgt:
-            continue
-        similar_gos.append(
-            {
-                "go_id": tgt.global_org_id,
-                "go_name": tgt.global_org_name,
-                "similarity": float(s.similarity_percent) if s.similarity_percent is not None else None,
-                "mapping_count": tgt.usage_count,
-            }
-        )
+    similar_gos = [
+        {
+            "go_id": target_id,
+            "go_name": target_name,
+            "similarity": float(similarity) if similarity is not None else None,
+            "mapping_count": usage_count,
+        }
+        for similarity, target_id, target_name, usage_count in rows
+    ]
 
-    return jsonify({"go_info": {"id": go.global_org_id, "name": go.global_org_name}, "similar_gos": similar_gos})
+    response = jsonify({"go_info": {"id": go.global_org_id, "name": go.global_org_name}, "similar_gos": similar_gos})
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @api_bp.get("/org-mappings/<int:go_id>/")
@@ -87,7 +136,12 @@ def org_mappings(go_id):
     go = GlobalOrganization.query.filter_by(global_org_id=go_id).first()
     if not go:
         return _json_error("Global organization not found", 404)
-    mappings = OrgMapping.query.filter_by(global_org_id=go_id).order_by(OrgMapping.id.asc()).all()
+    mappings = (
+        OrgMapping.query.filter_by(global_org_id=go_id)
+        .order_by(OrgMapping.id.asc())
+        .with_entities(*_MAPPING_COLUMNS)
+        .all()
+    )
     return jsonify(
         {
             "go_info": {
@@ -95,63 +149,87 @@ def org_mappings(go_id):
                 "global_org_name": go.global_org_name,
                 "global_acronym": go.global_acronym,
             },
-            "mappings": [
-                {
-                    "instance_org_id": m.instance_org_id,
-                    "instance_org_name": m.instance_org_name,
-                    "instance_org_acronym": m.instance_org_acronym,
-                    "instance_org_type": m.instance_org_type,
-                    "parent_instance_org_id": m.parent_instance_org_id,
-                    "fund_id": m.fund_id,
-                    "fund_name": m.fund_name,
-                    "match_percent": float(m.match_percent) if m.match_percent is not None else None,
-                    "risk_level": m.risk_level,
-                    "status": m.status,
-                }
-                for m in mappings
-            ],
+            "mappings": [_mapping_item(m) for m in mappings],
         }
     )
 
 
+def _mapping_item(m):
+    return {
+        "instance_org_id": m.instance_org_id,
+        "instance_org_name": m.instance_org_name,
+        "instance_org_acronym": m.instance_org_acronym,
+        "instance_org_type": m.instance_org_type,
+        "parent_instance_org_id": m.parent_instance_org_id,
+        "fund_id": m.fund_id,
+        "fund_name": m.fund_name,
+        "match_percent": float(m.match_percent) if m.match_percent is not None else None,
+        "risk_level": m.risk_level,
+        "status": m.status,
+    }
+
+
 @api_bp.get("/mapping-dashboard/")
 def mapping_dashboard():
     cache_key = "mapping_dashboard_data"
     cached = cache.get(cache_key)
     if cached:
-        return jsonify(cached)
+        return _conditional_json(*cached)
 
-    all_mappings = OrgMapping.query.order_by(OrgMapping.global_org_id.asc(), OrgMapping.id.asc()).all()
-    grouped = {}
-    for m in all_mappings:
-        grouped.setdefault(m.global_org_id, []).append(
-            {
-                "instance_org_id": m.instance_org_id,
-                "instance_org_name": m.instance_org_name,
-                "instance_org_acronym": m.instance_org_acronym,
-                "instance_org_type": m.instance_org_type,
-                "parent_instance_org_id": m.parent_instance_org_id,
-                "fund_id": m.fund_id,
-                "fund_name": m.fund_name,
-                "match_percent": float(m.match_percent) if m.match_percent is not None else None,
-                "risk_level": m.risk_level,
-                "status": m.status,
-            }
+    gos = (
+        db.session.query(
+            GlobalOrganization.global_org_id,
+            GlobalOrganization.global_org_name,
+            GlobalOrganization.global_acronym,
         )
+        .order_by(GlobalOrganization.global_org_id.asc())
+        .all()
+    )
+    mappings = (
+        OrgMapping.query.order_by(OrgMapping.global_org_id.asc(), OrgMapping.id.asc())
+        .with_entities(OrgMapping.global_org_id, *_MAPPING_COLUMNS)
+        .yield_per(2000)
+    )
+    dumps = current_app.json.dumps_bytes
+    ttl = current_app.config["CACHE_TTL_SECONDS"]
+
+    def generate():
+        # Both streams are sorted by global_org_id, so mappings are merge-joined
+        # onto GOs one entry at a time instead of being grouped up front.
+        chunks = []
+        mapping_iter = iter(mappings)
+        pending = next(mapping_iter, None)
+        for index, (go_id, go_name, go_acronym) in enumerate(gos):
+            go_mappings = []
+            while pending is not None and pending.global_org_id <= go_id:
+                if pending.global_org_id == go_id:
+                    go_mappings.append(_mapping_item(pending))
+                pending = next(mapping_iter, None)
+            chunk = (b"," if index else b"[") + dumps(
+                {
+                    "global_org_id": go_id,
+                    "global_org_name": go_name,
+                    "global_acronym": go_acronym,
+                    "mappings": go_mappings,
+                }
+            )
+            chunks.append(chunk)
+            yield chunk
+        tail = b"]\n" if gos else b"[]\n"
+        chunks.append(tail)
+        yield tail
+        body = b"".join(chunks)
+        cache.set(cache_key, (body, _body_etag(body)), ttl)
+
+    return current_app.response_class(stream_with_context(generate()), mimetype="application/json")
 
-    result = []
-    for go in GlobalOrganization.query.order_by(GlobalOrganization.global_org_id.asc()).all():
-        result.append(
-            {
-                "global_org_id": go.global_org_id,
-                "global_org_name": go.global_org_name,
-                "global_acronym": go.global_acronym,
-                "mappings": grouped.get(go.global_org_id, []),
-            }
-        )
 
-    cache.set(cache_key, result, current_app.config["CACHE_TTL_SECONDS"])
-    return jsonify(result)
+@lru_cache(maxsize=4)
+def _azure_openai_client(api_key, api_version, azure_endpoint, timeout):
+    # One client per config keeps its HTTP connection pool alive across requests.
+    from openai import AzureOpenAI
+
+    return AzureOpenAI(api_key=api_key, api_version=api_version, azure_endpoint=azure_endpoint, timeout=timeout)
 
 
 @api_bp.post("/ai-recommendation/")
@@ -182,16 +260,22 @@ Return strict JSON only:
   "reasoning": ["<reason1>", "<reason2>", "<reason3>"],
   "analysis": "<short explanation>"
 }}"""
-    try:
-        from openai import AzureOpenAI
+    # Same deployment + same prompt (i.e. same group members) reuses the last answer.
+    deployment = current_app.config["AZURE_OPENAI_DEPLOYMENT"]
+    cache_key = "ai_recommendation:" + hashlib.sha256(f"{deployment}\n{prompt}".encode()).hexdigest()
+    cached = cache.get(cache_key)
+    if cached:
+        return jsonify(cached)
 
-        client = AzureOpenAI(
-            api_key=current_app.config["AZURE_OPENAI_API_KEY"],
-            api_version=current_app.config["AZURE_OPENAI_API_VERSION"],
-            azure_endpoint=current_app.config["AZURE_OPENAI_ENDPOINT"],
+    try:
+        client = _azure_openai_client(
+            current_app.config["AZURE_OPENAI_API_KEY"],
+            current_app.config["AZURE_OPENAI_API_VERSION"],
+            current_app.config["AZURE_OPENAI_ENDPOINT"],
+            current_app.config["AZURE_OPENAI_TIMEOUT_SECONDS"],
         )
         completion = client.chat.completions.create(
-            model=current_app.config["AZURE_OPENAI_DEPLOYMENT"],
+            model=deployment,
             messages=[
                 {"role": "system", "content": "Respond with valid JSON only."},
                 {"role": "user", "content": prompt},
@@ -201,10 +285,10 @@ Return strict JSON only:
         )
 
         content = completion.choices[0].message.content if completion.choices else ""
-        response_text = content if isinstance(content, str) else json.dumps(content)
+        response_text = content if isinstance(content, str) else orjson.dumps(content).decode()
 
         candidates = []
-        fenced = re.search(r"```(?:json)?\s*(.*?)\s*```", response_text, flags=re.DOTALL | re.IGNORECASE)
+        fenced = _FENCED_JSON_RE.search(response_text)
         if fenced:
             candidates.append(fenced.group(1).strip())
         first = response_text.find("{")
@@ -217,7 +301,7 @@ Return strict JSON only:
         parse_error = None
         for item in candidates:
             try:
-                parsed = json.loads(item)
+                parsed = orjson.loads(item)
                 if isinstance(parsed, dict):
                     break
             except Exception as exc:
@@ -238,14 +322,14 @@ Return strict JSON only:
         elif not isinstance(reasoning, list):
             reasoning = [str(reasoning)]
 
-        return jsonify(
-            {
-                "recommended_id": parsed.get("recommended_id"),
-                "recommended_name": parsed.get("recommended_name"),
-                "reasoning": reasoning,
-                "analysis": parsed.get("analysis", ""),
-            }
-        )
+        result = {
+            "recommended_id": parsed.get("recommended_id"),
+            "recommended_name": parsed.get("recommended_name"),
+            "reasoning": reasoning,
+            "analysis": parsed.get("analysis", ""),
+        }
+        cache.set(cache_key, result, current_app.config["CACHE_TTL_SECONDS"])
+        return jsonify(result)
     except Exception as exc:
         return _json_error(f"Azure OpenAI API error: {str(exc)}", 500)
 
@@ -404,7 +488,7 @@ def list_merge_decisions():
     if request.args.get("target_global_org_id"):
         query = query.filter_by(target_global_org_id=request.args.get("target_global_org_id"))
 
-    decisions = query.order_by(MergeDecision.decided_at.desc()).all()
+    decisions = query.order_by(MergeDecision.decided_at.desc()).with_entities(*MergeDecision.__table__.columns).all()
     data = [
         {
             "decision_id": d.decision_id,
@@ -467,22 +551,26 @@ def update_merge_decision_status(decision_id):
         decision.executed_by = data.get("executed_by", "admin")
         decision.execution_notes = data.get("execution_notes", "")
 
-        updated = (
-            OrgMapping.query.filter(
+        moved_ids = db.session.execute(
+            update(OrgMapping)
+            .where(
                 and_(
                     OrgMapping.instance_org_id == decision.instance_org_id,
                     OrgMapping.global_org_id == decision.original_global_org_id,
                 )
             )
-            .update({"global_org_id": decision.target_global_org_id, "updated_at": datetime.utcnow()})
-        )
-        mapping_updated = updated > 0
-        if mapping_updated:
-            cache.delete("mapping_dashboard_data")
+            .values(global_org_id=decision.target_global_org_id, updated_at=datetime.utcnow())
+            .returning(OrgMapping.id)
+        ).scalars().all()
+        mapping_updated = bool(moved_ids)
     elif new_status == "cancelled":
         decision.execution_notes = data.get("execution_notes", "Cancelled by user")
 
     db.session.commit()
+    if mapping_updated:
+        # Both cached views embed per-GO mapping lists; drop them only once the move is committed.
+        cache.delete("mapping_dashboard_data")
+        cache.delete("go_summary_data")
     return jsonify(
         {
             "success": True,
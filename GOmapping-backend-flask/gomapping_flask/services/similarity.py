@@ -1,40 +1,64 @@
+import multiprocessing
+import os
 import re
-from difflib import SequenceMatcher
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from html import unescape
-from itertools import combinations
 
-from sqlalchemy import text
-from sqlalchemy import func
+import numpy as np
+from rapidfuzz import fuzz, process
+from sqlalchemy import func, insert, select, text, update
 
 from ..extensions import db
 from ..knowledge_base import get_recommendation_score
 from ..models import GlobalOrganization, GoSimilarity, OrgMapping
 
 
-STOP_WORDS = {
+# Below this many candidate pairs, process start-up costs more than it saves.
+PARALLEL_MIN_PAIRS = 50_000
+
+# Token bitmasks are V bits wide, so bit_count costs O(V/64); past this many
+# distinct tokens the frozenset Jaccard is cheaper and masks are not built.
+MASK_VOCAB_LIMIT = 128
+
+STOP_WORDS = frozenset({
     "the", "of", "for", "and", "in", "to", "a", "an", "at", "on", "&",
     "de", "del", "y", "et", "la", "le", "les", "el", "los", "las",
-}
+})
 
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+_WS_RE = re.compile(r"\s+")
 
+
+# Kept across recomputes: names rarely change between runs, so a repeat run
+# only re-normalizes new or renamed organizations.
+@lru_cache(maxsize=65536)
 def normalize_name(name: str) -> str:
     if not name:
         return ""
     name = unescape(name)
     name = name.lower()
-    name = re.sub(r"[^\w\s]", " ", name)
-    name = re.sub(r"\s+", " ", name).strip()
+    name = _NON_WORD_RE.sub(" ", name)
+    name = _WS_RE.sub(" ", name).strip()
     words = [w for w in name.split() if w and w not in STOP_WORDS]
     return " ".join(words)
 
 
-def token_set(norm: str) -> set[str]:
+def token_set(norm: str, token_ids: dict[str, int] | None = None) -> frozenset:
+    """
+    Word set of a normalized name. With token_ids, words are interned to ints
+    (new words get the next id), which hash and compare faster in set algebra.
+    """
     if not norm:
-        return set()
-    return set(norm.split())
+        return frozenset()
+    if token_ids is None:
+        return frozenset(norm.split())
+    return frozenset(token_ids.setdefault(w, len(token_ids)) for w in norm.split())
 
 
-def jaccard(a: set[str], b: set[str]) -> float:
+def jaccard(a: frozenset, b: frozenset) -> float:
     if not a or not b:
         return 0.0
     inter = len(a & b)
@@ -44,12 +68,30 @@ def jaccard(a: set[str], b: set[str]) -> float:
     return inter / union if union else 0.0
 
 
+@lru_cache(maxsize=200_000)
+def _cached_ratio(a: str, b: str) -> float:
+    return fuzz.ratio(a, b)
+
+
+def _seq_ratio(a: str, b: str) -> float:
+    # The ratio is symmetric; order the arguments so (a, b) and (b, a) share an entry.
+    return _cached_ratio(a, b) if a <= b else _cached_ratio(b, a)
+
+
+def mask_jaccard(a: int, b: int) -> float:
+    """jaccard() over token bitmasks (one bit per vocabulary word)."""
+    inter = (a & b).bit_count()
+    if inter == 0:
+        return 0.0
+    return inter / (a | b).bit_count()
+
+
 def weighted_similarity(
     norm1: str,
-    tok1: set[str],
+    tok1: frozenset,
     acr1: str,
     norm2: str,
-    tok2: set[str],
+    tok2: frozenset,
     acr2: str,
     original1: str = "",
     original2: str = "",
@@ -62,10 +104,10 @@ def weighted_similarity(
         orig2_clean = original2.lower().strip() if original2 else norm2
         if orig1_clean == orig2_clean:
             return 100.0
-        orig_sim = SequenceMatcher(None, orig1_clean, orig2_clean).ratio() * 100.0
+        orig_sim = _seq_ratio(orig1_clean, orig2_clean)
         return min(orig_sim, 98.0)
 
-    seq_sim = SequenceMatcher(None, norm1, norm2).ratio() * 100.0
+    seq_sim = _seq_ratio(norm1, norm2)
     token_sim = jaccard(tok1, tok2) * 100.0
     acronym_sim = 100.0 if (acr1 and acr2 and acr1 == acr2) else 0.0
 
@@ -77,7 +119,56 @@ def weighted_similarity(
     return min(final_sim, 100.0)
 
 
-def compute_similarity_edges(threshold=70.0, max_bucket=250):
+def _score_pairs(pairs, threshold):
+    edges = []
+    use_masks = bool(pairs) and "mask" in pairs[0][0]
+    for go1, go2 in pairs:
+        jac = mask_jaccard(go1["mask"], go2["mask"]) if use_masks else jaccard(go1["tok"], go2["tok"])
+        same_acr = bool(go1["acr"] and go2["acr"] and go1["acr"] == go2["acr"])
+        if jac < 0.10 and not same_acr:
+            continue
+
+        # The ratio can never beat 2*min(len)/(len1+len2); plug that bound into
+        # weighted_similarity's formula and skip pairs that cannot reach threshold.
+        len1, len2 = len(go1["norm"]), len(go2["norm"])
+        if go1["norm"] != go2["norm"]:
+            seq_upper = 200.0 * min(len1, len2) / (len1 + len2)
+            if same_acr:
+                upper = 75.0 + seq_upper * 0.15 + jac * 10.0
+            else:
+                upper = seq_upper * 0.5 + jac * 30.0
+            if upper + 1e-9 < threshold:
+                continue
+
+        sim = weighted_similarity(
+            go1["norm"],
+            go1["tok"],
+            go1["acr"],
+            go2["norm"],
+            go2["tok"],
+            go2["acr"],
+            go1.get("global_org_name", ""),
+            go2.get("global_org_name", ""),
+        )
+        if sim >= threshold:
+            edges.append((go1["global_org_id"], go2["global_org_id"], round(sim, 2)))
+
+    return edges
+
+
+_worker_gos = None
+
+
+def _init_worker(gos):
+    global _worker_gos
+    _worker_gos = gos
+
+
+def _score_index_pairs(index_pairs, threshold):
+    return _score_pairs([(_worker_gos[a], _worker_gos[b]) for a, b in index_pairs], threshold)
+
+
+def compute_similarity_edges(threshold=70.0, max_bucket=250, workers=None):
     gos = [
         {
             "global_org_id": go.global_org_id,
@@ -87,34 +178,51 @@ def compute_similarity_edges(threshold=70.0, max_bucket=250):
         for go in GlobalOrganization.query.order_by(GlobalOrganization.global_org_id.asc()).all()
     ]
 
+    token_ids = {}
     for go in gos:
         norm = normalize_name(go.get("global_org_name") or "")
         go["norm"] = norm
-        go["tok"] = token_set(norm)
+        words = token_set(norm)
+        go["shortest"] = min(words, key=len) if words else ""
+        go["tok"] = token_set(norm, token_ids)
         go["acr"] = (go.get("global_acronym") or "").upper().strip()
+    if len(token_ids) <= MASK_VOCAB_LIMIT:
+        # Token ids double as bit positions for mask_jaccard.
+        for go in gos:
+            mask = 0
+            for token in go["tok"]:
+                mask |= 1 << token
+            go["mask"] = mask
 
     buckets = {}
     for idx, go in enumerate(gos):
+        # Empty names always score 0.0, so never make them candidates.
+        if not go["norm"]:
+            continue
         keys = set()
         acr = go["acr"]
         if acr and 2 <= len(acr) <= 12:
             keys.add(f"acr:{acr}")
 
-        words = (go["norm"] or "").split()
+        words = go["norm"].split()
         if words:
             keys.add(f"t0:{words[0]}")
             keys.add(f"p3:{words[0][:3]}")
             if len(words) >= 2:
                 keys.add(f"t01:{words[0]}_{words[1]}")
 
-        if go["tok"]:
-            shortest = min(go["tok"], key=len)
-            if len(shortest) >= 4:
-                keys.add(f"sh:{shortest[:4]}")
+        shortest = go["shortest"]
+        if len(shortest) >= 4:
+            keys.add(f"sh:{shortest[:4]}")
 
         for key in keys:
             buckets.setdefault(key, []).append(idx)
 
+    # Without an acronym match weighted_similarity is at most 0.5*seq + 30, so
+    # a bucket-wide C ratio matrix drops pairs whose seq cannot reach threshold.
+    # Same-acronym and identical-norm pairs always survive; survivors are scored
+    # exactly below.
+    seq_cutoff = min(max(0.0, 2.0 * (threshold - 30.0) - 1e-6), 100.0)
     seen_pairs = set()
     candidate_pairs = []
     for _, idxs in buckets.items():
@@ -122,7 +230,14 @@ def compute_similarity_edges(threshold=70.0, max_bucket=250):
             continue
         if len(idxs) > max_bucket:
             continue
-        for a, b in combinations(idxs, 2):
+        norms = [gos[i]["norm"] for i in idxs]
+        keep = process.cdist(
+            norms, norms, scorer=fuzz.ratio, dtype=np.float64, score_cutoff=seq_cutoff
+        ) >= seq_cutoff
+        acrs = np.array([gos[i]["acr"] for i in idxs], dtype=object)
+        keep |= (acrs[:, None] == acrs[None, :]) & (acrs != "")[:, None]
+        for x, y in zip(*np.nonzero(np.triu(keep, 1))):
+            a, b = idxs[x], idxs[y]
             id1 = gos[a]["global_org_id"]
             id2 = gos[b]["global_org_id"]
             lo, hi = (id1, id2) if id1 < id2 else (id2, id1)
@@ -132,159 +247,245 @@ def compute_similarity_edges(threshold=70.0, max_bucket=250):
             seen_pairs.add(pair_key)
             candidate_pairs.append((a, b))
 
-    edges = []
-    for a, b in candidate_pairs:
-        go1 = gos[a]
-        go2 = gos[b]
-
-        jac = jaccard(go1["tok"], go2["tok"])
-        if jac < 0.10 and not (go1["acr"] and go2["acr"] and go1["acr"] == go2["acr"]):
-            continue
-
-        sim = weighted_similarity(
-            go1["norm"],
-            go1["tok"],
-            go1["acr"],
-            go2["norm"],
-            go2["tok"],
-            go2["acr"],
-            go1.get("global_org_name", ""),
-            go2.get("global_org_name", ""),
-        )
-        if sim >= threshold:
-            edges.append((go1["global_org_id"], go2["global_org_id"], round(sim, 2)))
-
-    return edges
+    # Pair scoring is pure Python and CPU-bound; large runs are sharded across
+    # worker processes (in candidate order, so the edge list is unchanged).
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(candidate_pairs) < PARALLEL_MIN_PAIRS:
+        return _score_pairs([(gos[a], gos[b]) for a, b in candidate_pairs], threshold)
+
+    shard_size = -(-len(candidate_pairs) // (workers * 4))
+    shards = [
+        candidate_pairs[start : start + shard_size]
+        for start in range(0, len(candidate_pairs), shard_size)
+    ]
+    # Each worker receives the organization list once; shards are index pairs.
+    # Never fork: this runs on request and background threads, and a forked
+    # child can inherit locks (DB pool, logging, _recompute_lock) held elsewhere.
+    start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(start_method),
+        initializer=_init_worker,
+        initargs=(gos,),
+    ) as pool:
+        results = pool.map(_score_index_pairs, shards, [threshold] * len(shards))
+        return [edge for shard_edges in results for edge in shard_edges]
 
 
 def recalculate_similarity_table(threshold=70.0, max_bucket=250):
-    db.session.execute(text("DELETE FROM go_similarity"))
+    _cached_ratio.cache_clear()
+    if db.engine.dialect.name == "sqlite":
+        db.session.execute(text("DELETE FROM go_similarity"))
+    else:
+        db.session.execute(text("TRUNCATE TABLE go_similarity"))
     edges = compute_similarity_edges(threshold=threshold, max_bucket=max_bucket)
 
-    rows = []
-    for source_id, target_id, score in edges:
-        rows.append(
-            {
-                "source_global_org_id": source_id,
-                "target_global_org_id": target_id,
-                "similarity_percent": score,
-            }
+    if edges:
+        # Core executemany insert of one direction only (source < target, as
+        # the edges come out of compute_similarity_edges); the database then
+        # copies the mirrored rows itself.
+        db.session.execute(
+            insert(GoSimilarity),
+            [
+                {
+                    "source_global_org_id": source_id,
+                    "target_global_org_id": target_id,
+                    "similarity_percent": score,
+                }
+                for source_id, target_id, score in edges
+            ],
         )
-        rows.append(
-            {
-                "source_global_org_id": target_id,
-                "target_global_org_id": source_id,
-                "similarity_percent": score,
-            }
+        db.session.execute(
+            text(
+                "INSERT INTO go_similarity "
+                "(source_global_org_id, target_global_org_id, similarity_percent) "
+                "SELECT target_global_org_id, source_global_org_id, similarity_percent "
+                "FROM go_similarity"
+            )
         )
-
-    if rows:
-        db.session.bulk_insert_mappings(GoSimilarity, rows)
     db.session.commit()
     return len(edges)
 
 
+_recompute_lock = threading.Lock()
+
+
+def recompute_similarity(threshold=70.0):
+    """Refresh usage counts and rebuild go_similarity; one run at a time per process."""
+    with _recompute_lock:
+        refresh_usage_counts()
+        recalculate_similarity_table(threshold=threshold)
+
+
+def start_background_recompute(app, threshold=70.0, on_complete=None):
+    """
+    Run the recompute in a daemon thread under its own app context, then call
+    on_complete there. Returns False if a recompute is already running.
+    """
+    if not _recompute_lock.acquire(blocking=False):
+        return False
+
+    def run():
+        try:
+            with app.app_context():
+                refresh_usage_counts()
+                recalculate_similarity_table(threshold=threshold)
+                if on_complete:
+                    on_complete()
+        except Exception:
+            app.logger.exception("Background similarity recompute failed")
+        finally:
+            _recompute_lock.release()
+
+    threading.Thread(target=run, name="similarity-recompute", daemon=True).start()
+    return True
+
+
 def refresh_usage_counts():
-    counts = (
-        db.session.query(OrgMapping.global_org_id, func.count(OrgMapping.id))
-        .group_by(OrgMapping.global_org_id)
-        .all()
+    mapping_count = (
+        select(func.count(OrgMapping.id))
+        .where(OrgMapping.global_org_id == GlobalOrganization.global_org_id)
+        .scalar_subquery()
+    )
+    db.session.execute(
+        update(GlobalOrganization).values(usage_count=mapping_count),
+        execution_options={"synchronize_session": False},
     )
-    count_map = {go_id: count for go_id, count in counts}
-    all_gos = GlobalOrganization.query.all()
-    for go in all_gos:
-        go.usage_count = count_map.get(go.global_org_id, 0)
     db.session.commit()
 
 
-def build_go_summary_response():
-    similarities = GoSimilarity.query.all()
-    go_groups = {}
-    groups = {}
-    next_group_id = 1
+def _instance_orgs_by_go(limit=20):
+    """First `limit` mappings (by id) of every GO, fetched in one windowed query."""
+    ranked = db.session.query(
+        OrgMapping.global_org_id,
+        OrgMapping.instance_org_id,
+        OrgMapping.instance_org_name,
+        OrgMapping.instance_org_acronym,
+        OrgMapping.instance_org_type,
+        OrgMapping.fund_name,
+        OrgMapping.match_percent,
+        func.row_number()
+        .over(partition_by=OrgMapping.global_org_id, order_by=OrgMapping.id)
+        .label("rn"),
+    ).subquery()
+    rows = (
+        db.session.query(ranked)
+        .filter(ranked.c.rn <= limit)
+        .order_by(ranked.c.global_org_id, ranked.c.rn)
+        .all()
+    )
+
+    instance_orgs = defaultdict(list)
+    for row in rows:
+        instance_orgs[row[0]].append(
+            {
+                "instance_org_id": row[1],
+                "instance_org_name": row[2],
+                "instance_org_acronym": row[3],
+                "instance_org_type": row[4],
+                "fund_name": row[5],
+                "match_percent": float(row[6]) if row[6] is not None else None,
+            }
+        )
+    return instance_orgs
+
+
+def _group_similar_gos(similarities):
+    """
+    Union-find over similarity edges. Returns ({group_id: set(go_ids)},
+    {group_id: max similarity_percent}) with group ids numbered by the order in
+    which each group's first GO appears.
+    """
+    parent = {}
+    rank = {}
+    best = {}
+
+    def find(x):
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
 
     for item in similarities:
-        source_id = item.source_global_org_id
-        target_id = item.target_global_org_id
-        source_group = go_groups.get(source_id)
-        target_group = go_groups.get(target_id)
-
-        if source_group is None and target_group is None:
-            go_groups[source_id] = next_group_id
-            go_groups[target_id] = next_group_id
-            groups[next_group_id] = {source_id, target_id}
-            next_group_id += 1
-        elif source_group is None:
-            go_groups[source_id] = target_group
-            groups[target_group].add(source_id)
-        elif target_group is None:
-            go_groups[target_id] = source_group
-            groups[source_group].add(target_id)
-        elif source_group != target_group:
-            for go_id in groups[target_group]:
-                go_groups[go_id] = source_group
-                groups[source_group].add(go_id)
-            del groups[target_group]
+        a = item.source_global_org_id
+        b = item.target_global_org_id
+        for x in (a, b):
+            if x not in parent:
+                parent[x] = x
+                rank[x] = 0
+                best[x] = 0.0
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            if rank[root_a] < rank[root_b]:
+                root_a, root_b = root_b, root_a
+            parent[root_b] = root_a
+            if rank[root_a] == rank[root_b]:
+                rank[root_a] += 1
+            best[root_a] = max(best[root_a], best[root_b])
+        if item.similarity_percent is not None:
+            best[root_a] = max(best[root_a], float(item.similarity_percent))
+
+    group_ids = {}
+    groups = {}
+    max_similarity = {}
+    for go_id in parent:
+        root = find(go_id)
+        group_id = group_ids.setdefault(root, len(group_ids) + 1)
+        groups.setdefault(group_id, set()).add(go_id)
+        max_similarity[group_id] = best[root]
+    return groups, max_similarity
+
+
+def build_go_summary_response():
+    similarities = GoSimilarity.query.all()
+    gos_by_id = {
+        go.global_org_id: go
+        for go in GlobalOrganization.query.order_by(GlobalOrganization.global_org_id.asc()).all()
+    }
+    instance_orgs_by_go = _instance_orgs_by_go()
+    groups, max_similarity_by_group = _group_similar_gos(similarities)
 
     duplicate_groups = []
     grouped_ids = set()
+    pending_groups = []
 
     for group_id, go_ids in groups.items():
         if len(go_ids) < 2:
             continue
 
-        go_list = GlobalOrganization.query.filter(GlobalOrganization.global_org_id.in_(list(go_ids))).all()
+        go_list = [gos_by_id[go_id] for go_id in sorted(go_ids) if go_id in gos_by_id]
         members = []
         total_instances = 0
-        max_similarity = 0.0
-
-        pair_scores = GoSimilarity.query.filter(
-            GoSimilarity.source_global_org_id.in_(list(go_ids)),
-            GoSimilarity.target_global_org_id.in_(list(go_ids)),
-        ).all()
-        if pair_scores:
-            max_similarity = max(float(x.similarity_percent) for x in pair_scores if x.similarity_percent is not None)
+        max_similarity = max_similarity_by_group[group_id]
 
         for go in go_list:
             usage = go.usage_count or 0
             total_instances += usage
-            instance_orgs = (
-                OrgMapping.query.filter_by(global_org_id=go.global_org_id)
-                .with_entities(
-                    OrgMapping.instance_org_id,
-                    OrgMapping.instance_org_name,
-                    OrgMapping.instance_org_acronym,
-                    OrgMapping.instance_org_type,
-                    OrgMapping.fund_name,
-                    OrgMapping.match_percent,
-                )
-                .limit(20)
-                .all()
+            members.append(
+                {
+                    "global_org_id": go.global_org_id,
+                    "global_org_name": go.global_org_name,
+                    "global_org_acronym": go.global_acronym or "",
+                    "usage_count": usage,
+                    "name_length": len(go.global_org_name or ""),
+                    "instance_organizations": instance_orgs_by_go.get(go.global_org_id, []),
+                }
             )
-            item = {
-                "global_org_id": go.global_org_id,
-                "global_org_name": go.global_org_name,
-                "global_org_acronym": go.global_acronym or "",
-                "usage_count": usage,
-                "name_length": len(go.global_org_name or ""),
-                "instance_organizations": [
-                    {
-                        "instance_org_id": row[0],
-                        "instance_org_name": row[1],
-                        "instance_org_acronym": row[2],
-                        "instance_org_type": row[3],
-                        "fund_name": row[4],
-                        "match_percent": float(row[5]) if row[5] is not None else None,
-                    }
-                    for row in instance_orgs
-                ],
-            }
-            rec = get_recommendation_score(item["global_org_name"], item["usage_count"])
-            item["recommendation_score"] = rec["score"]
-            item["kb_match"] = rec["kb_match"]
-            item["kb_standard_name"] = rec.get("standard_name")
-            members.append(item)
-
+        pending_groups.append((group_id, members, total_instances, max_similarity))
+
+    # get_recommendation_score is memoized, and keeps the int/float score
+    # types of the original response.
+    all_members = [m for _, members, _, _ in pending_groups for m in members]
+    for item in all_members:
+        rec = get_recommendation_score(item["global_org_name"], item["usage_count"])
+        item["recommendation_score"] = rec.score
+        item["kb_match"] = rec.kb_match
+        item["kb_standard_name"] = rec.standard_name
+
+    for group_id, members, total_instances, max_similarity in pending_groups:
         recommended = max(members, key=lambda x: x["recommendation_score"])
         for m in members:
             m["is_recommended"] = m["global_org_id"] == recommended["global_org_id"]
@@ -311,44 +512,21 @@ def build_go_summary_response():
     duplicate_groups.sort(key=lambda x: -x["max_similarity"])
 
     unique_organizations = []
-    for go in GlobalOrganization.query.all():
+    for go in gos_by_id.values():
         if go.global_org_id in grouped_ids:
             continue
-        instance_orgs = (
-            OrgMapping.query.filter_by(global_org_id=go.global_org_id)
-            .with_entities(
-                OrgMapping.instance_org_id,
-                OrgMapping.instance_org_name,
-                OrgMapping.instance_org_acronym,
-                OrgMapping.instance_org_type,
-                OrgMapping.fund_name,
-                OrgMapping.match_percent,
-            )
-            .limit(20)
-            .all()
-        )
         unique_organizations.append(
             {
                 "global_org_id": go.global_org_id,
                 "global_org_name": go.global_org_name,
                 "global_org_acronym": go.global_acronym or "",
                 "usage_count": go.usage_count or 0,
-                "instance_organizations": [
-                    {
-                        "instance_org_id": row[0],
-                        "instance_org_name": row[1],
-                        "instance_org_acronym": row[2],
-                        "instance_org_type": row[3],
-                        "fund_name": row[4],
-                        "match_percent": float(row[5]) if row[5] is not None else None,
-                    }
-                    for row in instance_orgs
-                ],
+                "instance_organizations": instance_orgs_by_go.get(go.global_org_id, []),
             }
         )
     unique_organizations.sort(key=lambda x: -x["usage_count"])
 
-    total_orgs = GlobalOrganization.query.count()
+    total_orgs = len(gos_by_id)
     return {
         "duplicate_groups": duplicate_groups,
         "unique_organizations": unique_organizations,
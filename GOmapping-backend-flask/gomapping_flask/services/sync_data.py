@@ -2,11 +2,13 @@ import csv
 import hashlib
 from datetime import datetime, timedelta
 from decimal import Decimal
-from difflib import SequenceMatcher
-from io import StringIO
+from io import TextIOWrapper
 
 import requests
 from flask import current_app
+from rapidfuzz import fuzz
+from rapidfuzz.distance import JaroWinkler
+from sqlalchemy import insert, update
 
 from ..cache import cache
 from ..extensions import db
@@ -29,11 +31,26 @@ def _parse_str(value):
     return str(value).strip() if value is not None else ""
 
 
-def _calculate_match_percent(instance_name, global_name):
+def _jaro_winkler(a, b):
+    return JaroWinkler.normalized_similarity(a, b) * 100
+
+
+# Both return 0-100; selected with the MATCH_SCORER setting.
+MATCH_SCORERS = {
+    "ratio": fuzz.ratio,
+    "jaro_winkler": _jaro_winkler,
+}
+
+
+def _calculate_match_percent(instance_name, global_name, scorer=fuzz.ratio):
     if not instance_name or not global_name:
         return None
-    ratio = SequenceMatcher(None, instance_name.lower().strip(), global_name.lower().strip()).ratio()
-    return Decimal(str(round(ratio * 100, 2)))
+    a = instance_name.lower().strip()
+    b = global_name.lower().strip()
+    if a == b:
+        return Decimal("100.00")
+    ratio = scorer(a, b)
+    return Decimal(str(round(ratio, 2)))
 
 
 class SmartDataSyncService:
@@ -47,22 +64,41 @@ class SmartDataSyncService:
     DEFAULT_USER = "35e38643-0226-4f33-81e3-c09f46a2136b"
     DEFAULT_PASSWORD = "trigyn123"
     MIN_SYNC_INTERVAL = 30
+    # Rows written per transaction, so a failed sync keeps the batches before it.
+    UPSERT_BATCH_SIZE = 1000
 
     def __init__(self, auth=None):
         self.auth = auth or (self.DEFAULT_USER, self.DEFAULT_PASSWORD)
 
-    def fetch_csv_rows(self, url, timeout=120):
-        resp = requests.get(url, auth=self.auth, timeout=timeout)
-        resp.raise_for_status()
-        text = resp.content.decode("utf-8-sig", errors="replace")
-        return list(csv.DictReader(StringIO(text)))
+    def iter_csv_rows(self, url, timeout=120):
+        """
+        Yield CSV rows while the body is still downloading instead of buffering
+        and decoding the whole response first.
+        """
+        with requests.get(url, auth=self.auth, stream=True, timeout=timeout) as resp:
+            resp.raise_for_status()
+            # Read the raw stream gunzipped, and keep it "open" at EOF so the
+            # text wrapper sees end-of-file rather than a closed file.
+            resp.raw.decode_content = True
+            resp.raw.auto_close = False
+            # newline="" keeps line breaks inside quoted fields intact for csv.
+            text = TextIOWrapper(resp.raw, encoding="utf-8-sig", errors="replace", newline="")
+            yield from csv.DictReader(text)
 
     def get_data_checksum(self, sync_type, sample_size=10240):
         url = self.ORG_SUMMARY_URL if sync_type == "org_mapping" else self.GLOBAL_ORG_URL
         try:
-            response = requests.get(url, auth=self.auth, stream=True, timeout=30)
-            response.raise_for_status()
-            sample_data = response.raw.read(sample_size)
+            # A HEAD with ETag/Last-Modified fingerprints the whole file without
+            # downloading it; hashing the validator keeps it within the column.
+            # Servers without validators (or without HEAD) fall back to sampling.
+            head = requests.head(url, auth=self.auth, timeout=30, allow_redirects=True)
+            validator = head.ok and (head.headers.get("ETag") or head.headers.get("Last-Modified"))
+            if validator:
+                return hashlib.md5(validator.encode()).hexdigest()
+
+            with requests.get(url, auth=self.auth, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                sample_data = response.raw.read(sample_size)
             return hashlib.md5(sample_data).hexdigest()
         except Exception:
             return None
@@ -98,33 +134,42 @@ class SmartDataSyncService:
     def upsert_global_orgs(self, rows):
         created = 0
         updated = 0
-        for row in rows:
-            go_id = _parse_int(row.get("ParentOrganizationId"))
-            if go_id is None:
-                continue
-            name = _parse_str(row.get("GlobalOrgName"))
-            if not name:
-                continue
-            acronym = _parse_str(row.get("GlobalOrgAcronym")) or None
-            if acronym and len(acronym) > 50:
-                acronym = acronym[:50]
-
-            item = GlobalOrganization.query.filter_by(global_org_id=go_id).first()
-            if item:
-                item.global_org_name = name
-                item.global_acronym = acronym
-                updated += 1
-            else:
-                db.session.add(
-                    GlobalOrganization(
+        # One SELECT up front instead of one per CSV row.
+        existing = {item.global_org_id: item for item in GlobalOrganization.query.all()}
+        row_number = 0
+        try:
+            for row_number, row in enumerate(rows, 1):
+                go_id = _parse_int(row.get("ParentOrganizationId"))
+                if go_id is None:
+                    continue
+                name = _parse_str(row.get("GlobalOrgName"))
+                if not name:
+                    continue
+                acronym = _parse_str(row.get("GlobalOrgAcronym")) or None
+                if acronym and len(acronym) > 50:
+                    acronym = acronym[:50]
+
+                item = existing.get(go_id)
+                if item:
+                    item.global_org_name = name
+                    item.global_acronym = acronym
+                    updated += 1
+                else:
+                    item = GlobalOrganization(
                         global_org_id=go_id,
                         global_org_name=name,
                         global_acronym=acronym,
                         usage_count=0,
                     )
-                )
-                created += 1
-        db.session.commit()
+                    db.session.add(item)
+                    existing[go_id] = item
+                    created += 1
+                if (created + updated) % self.UPSERT_BATCH_SIZE == 0:
+                    db.session.commit()
+            db.session.commit()
+        except Exception:
+            current_app.logger.exception("Global organization upsert failed at CSV row %d", row_number)
+            raise
         return created, updated
 
     def upsert_org_mappings(self, rows):
@@ -132,7 +177,16 @@ class SmartDataSyncService:
         updated = 0
         valid_rows = 0
 
+        scorer = MATCH_SCORERS[current_app.config.get("MATCH_SCORER", "ratio")]
         global_names = {g.global_org_id: g.global_org_name for g in GlobalOrganization.query.all()}
+        existing = {}
+        for pk, *key in db.session.query(
+            OrgMapping.id, OrgMapping.instance_org_id, OrgMapping.fund_id, OrgMapping.global_org_id
+        ).order_by(OrgMapping.id):
+            existing.setdefault(tuple(key), pk)
+        # Keyed so a mapping repeated in the CSV keeps only its last values.
+        update_rows = {}
+        insert_rows = {}
 
         for row in rows:
             instance_org_id = _parse_int(row.get("OrganizationId"))
@@ -147,49 +201,57 @@ class SmartDataSyncService:
                 continue
 
             fund_id = _parse_int(row.get("PooledFundId"))
-            match_percent = _calculate_match_percent(instance_org_name, global_names.get(global_org_id, ""))
+            match_percent = _calculate_match_percent(instance_org_name, global_names.get(global_org_id, ""), scorer)
             status_val = _parse_str(row.get("DueDiligenceStatus")) or None
             if status_val and len(status_val) > 50:
                 status_val = status_val[:50]
 
-            item = OrgMapping.query.filter_by(
-                instance_org_id=instance_org_id,
-                fund_id=fund_id,
-                global_org_id=global_org_id,
-            ).first()
-
-            if item:
-                item.instance_org_name = instance_org_name
-                item.instance_org_type = instance_org_type
-                item.instance_org_acronym = _parse_str(row.get("OrganizationAcronym")) or None
-                item.fund_name = _parse_str(row.get("PooledFundName")) or None
-                item.match_percent = match_percent
-                item.status = status_val
-                item.updated_at = datetime.utcnow()
+            key = (instance_org_id, fund_id, global_org_id)
+            values = {
+                "instance_org_name": instance_org_name,
+                "instance_org_type": instance_org_type,
+                "instance_org_acronym": _parse_str(row.get("OrganizationAcronym")) or None,
+                "fund_name": _parse_str(row.get("PooledFundName")) or None,
+                "match_percent": match_percent,
+                "status": status_val,
+                "updated_at": datetime.utcnow(),
+            }
+
+            pk = existing.get(key)
+            if pk is not None:
+                update_rows[pk] = {"id": pk, **values}
+                updated += 1
+            elif key in insert_rows:
+                insert_rows[key].update(values)
                 updated += 1
             else:
-                db.session.add(
-                    OrgMapping(
-                        global_org_id=global_org_id,
-                        instance_org_id=instance_org_id,
-                        instance_org_name=instance_org_name,
-                        instance_org_acronym=_parse_str(row.get("OrganizationAcronym")) or None,
-                        instance_org_type=instance_org_type,
-                        parent_instance_org_id=None,
-                        fund_id=fund_id,
-                        fund_name=_parse_str(row.get("PooledFundName")) or None,
-                        match_percent=match_percent,
-                        risk_level=None,
-                        status=status_val,
-                        created_at=datetime.utcnow(),
-                        updated_at=datetime.utcnow(),
-                    )
-                )
+                insert_rows[key] = {
+                    "global_org_id": global_org_id,
+                    "instance_org_id": instance_org_id,
+                    "parent_instance_org_id": None,
+                    "fund_id": fund_id,
+                    "risk_level": None,
+                    "created_at": values["updated_at"],
+                    **values,
+                }
                 created += 1
 
-        db.session.commit()
+        # One executemany per batch instead of a flush per ORM object.
+        self._write_batches(update(OrgMapping), list(update_rows.values()), "update")
+        self._write_batches(insert(OrgMapping), list(insert_rows.values()), "insert")
         return valid_rows, created, updated
 
+    def _write_batches(self, statement, params, label):
+        start = 0
+        try:
+            for start in range(0, len(params), self.UPSERT_BATCH_SIZE):
+                db.session.execute(statement, params[start : start + self.UPSERT_BATCH_SIZE])
+                db.session.commit()
+        except Exception:
+            end = min(start + self.UPSERT_BATCH_SIZE, len(params))
+            current_app.logger.exception("Org mapping %s failed for rows %d-%d", label, start + 1, end)
+            raise
+
     def _sync_data(self, sync_type, url, upsert_function, triggered_by="manual", force=False):
         should_sync, reason, last_sync = self.should_sync(sync_type, force)
         if not should_sync:
@@ -234,15 +296,21 @@ class SmartDataSyncService:
         db.session.add(log)
         db.session.commit()
 
-        try:
-            rows = self.fetch_csv_rows(url, timeout=120)
-            log.records_fetched = len(rows)
+        rows_read = 0
+
+        def counted_rows():
+            nonlocal rows_read
+            for row in self.iter_csv_rows(url, timeout=120):
+                rows_read += 1
+                yield row
 
+        try:
             if upsert_function == "upsert_global_orgs":
-                created, updated = self.upsert_global_orgs(rows)
-                fetched = len(rows)
+                created, updated = self.upsert_global_orgs(counted_rows())
+                fetched = rows_read
             else:
-                fetched, created, updated = self.upsert_org_mappings(rows)
+                fetched, created, updated = self.upsert_org_mappings(counted_rows())
+            log.records_fetched = rows_read
 
             log.records_created = created
             log.records_updated = updated
@@ -0,0 +1,42 @@
+import unittest
+
+from gomapping_flask.cache import TTLCache
+
+
+class TTLCacheHeapTest(unittest.TestCase):
+    def test_heap_stays_bounded_on_overwrites(self):
+        cache = TTLCache(max_size=10)
+        for i in range(100_000):
+            cache.set(i % 50, i, 3600)
+        self.assertEqual(len(cache._store), 10)
+        self.assertLessEqual(len(cache._heap), 2 * cache.max_size)
+
+    def test_live_entries_still_expire_after_compaction(self):
+        cache = TTLCache(max_size=10)
+        for i in range(1_000):
+            cache.set(i, i, 3600)
+        cache.set("short", 1, -1)
+        cache.set("next", 2, 3600)
+        self.assertIsNone(cache.get("short"))
+        self.assertEqual(cache.get("next"), 2)
+
+    def test_heap_stays_bounded_on_deletes(self):
+        cache = TTLCache(max_size=1_000)
+        for i in range(10_000):
+            cache.set(i, i, 3600)
+            cache.delete(i)
+        self.assertEqual(len(cache._store), 0)
+        self.assertLessEqual(len(cache._heap), 32)
+
+    def test_lru_eviction_keeps_heap_in_sync(self):
+        cache = TTLCache(max_size=100)
+        for i in range(10_000):
+            cache.set(i, i, 3600)
+        self.assertEqual(len(cache._store), 100)
+        self.assertLessEqual(len(cache._heap), 2 * len(cache._store) + 32)
+        self.assertEqual(cache.get(9_999), 9_999)
+        self.assertIsNone(cache.get(0))
+
+
+if __name__ == "__main__":
+    unittest.main()
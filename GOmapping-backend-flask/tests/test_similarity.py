@@ -0,0 +1,60 @@
+import random
+import unittest
+
+from gomapping_flask.services.similarity import (
+    _score_pairs,
+    jaccard,
+    mask_jaccard,
+    normalize_name,
+    token_set,
+)
+
+
+def _build_gos(names, with_masks):
+    token_ids = {}
+    gos = []
+    for i, name in enumerate(names, start=1):
+        norm = normalize_name(name)
+        go = {
+            "global_org_id": i,
+            "global_org_name": name,
+            "norm": norm,
+            "tok": token_set(norm, token_ids),
+            "acr": "",
+        }
+        if with_masks:
+            go["mask"] = sum(1 << token for token in go["tok"])
+        gos.append(go)
+    return gos
+
+
+def _all_pairs(gos):
+    return [(a, b) for i, a in enumerate(gos) for b in gos[i + 1 :]]
+
+
+class JaccardParityTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        words = [f"w{i}" for i in range(300)]
+        self.names = [
+            " ".join(rng.choice(words[: rng.choice((20, 300))]) for _ in range(rng.randint(1, 5)))
+            for _ in range(120)
+        ]
+
+    def test_mask_jaccard_matches_jaccard(self):
+        gos = _build_gos(self.names, with_masks=True)
+        for go1 in gos:
+            for go2 in gos:
+                self.assertAlmostEqual(
+                    mask_jaccard(go1["mask"], go2["mask"]), jaccard(go1["tok"], go2["tok"])
+                )
+
+    def test_score_pairs_same_with_and_without_masks(self):
+        with_masks = _score_pairs(_all_pairs(_build_gos(self.names, with_masks=True)), 40.0)
+        without_masks = _score_pairs(_all_pairs(_build_gos(self.names, with_masks=False)), 40.0)
+        self.assertTrue(with_masks)
+        self.assertEqual(with_masks, without_masks)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+"""
+Data version stamp for the read-heavy view caches.
+
+Cached payloads derived from the mapping tables are keyed with the current
+version, so bumping it after a write invalidates all of them at once.
+"""
+
+import time
+
+from django.core.cache import cache
+
+DATA_VERSION_KEY = 'gom_data_version'
+
+
+def get_data_version():
+    """Return the current data version, starting a fresh one if it was evicted."""
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        # Time-based start so a lost stamp never reuses an older version
+        cache.add(DATA_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(DATA_VERSION_KEY)
+    return version
+
+
+def bump_data_version():
+    """Invalidate every versioned cache entry (call after writing mapping data)."""
+    try:
+        cache.incr(DATA_VERSION_KEY)
+    except ValueError:
+        cache.add(DATA_VERSION_KEY, time.time_ns(), None)
+
+
+def versioned_key(name, *parts):
+    """Cache key for name/parts under the current data version."""
+    return ':'.join([name, *map(str, parts), str(get_data_version())])
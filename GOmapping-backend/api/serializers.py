@@ -16,8 +16,16 @@ class GlobalOrganizationSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class GlobalOrganizationSlimSerializer(serializers.ModelSerializer):
+    """Nested representation: only the fields shown next to a mapping/similarity."""
+    class Meta:
+        model = GlobalOrganization
+        fields = ('global_org_id', 'global_org_name', 'global_acronym')
+
+
 class OrgMappingSerializer(serializers.ModelSerializer):
-    global_org = GlobalOrganizationSerializer(read_only=True)
+    # Querysets should use select_related('global_org') to avoid a query per row.
+    global_org = GlobalOrganizationSlimSerializer(read_only=True)
     
     class Meta:
         model = OrgMapping
@@ -25,8 +33,9 @@ class OrgMappingSerializer(serializers.ModelSerializer):
 
 
 class GoSimilaritySerializer(serializers.ModelSerializer):
-    source_org = GlobalOrganizationSerializer(source='source_global_org', read_only=True)
-    target_org = GlobalOrganizationSerializer(source='target_global_org', read_only=True)
+    # Querysets should use select_related('source_global_org', 'target_global_org').
+    source_org = GlobalOrganizationSlimSerializer(source='source_global_org', read_only=True)
+    target_org = GlobalOrganizationSlimSerializer(source='target_global_org', read_only=True)
     
     class Meta:
         model = GoSimilarity
@@ -4,14 +4,36 @@ Provides data sync, change detection, and sync status management.
 """
 
 import hashlib
+import os
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from django.conf import settings
 from django.utils import timezone
 from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Case, Count, F, Q, TextField, Value, When
 
 from orgnizations.models import DataSyncLog
 
+from .cache_version import bump_data_version
+
+
+def _new_checksum_digest():
+    """Hash object for data checksums (settings.SYNC_CHECKSUM_ALGORITHM)."""
+    if getattr(settings, 'SYNC_CHECKSUM_ALGORITHM', 'md5') == 'xxh3_128':
+        import xxhash  # optional, only needed when enabled
+        return xxhash.xxh3_128()
+    return hashlib.md5(usedforsecurity=False)
+
+
+def _validator_checksum(etag, last_modified):
+    """Checksum derived from the HTTP validators instead of the body."""
+    digest = _new_checksum_digest()
+    digest.update(f"{etag or ''}|{last_modified or ''}".encode())
+    return digest.hexdigest()
+
 
 class SmartDataSyncService:
     """Smart data synchronization service."""
@@ -33,11 +55,36 @@ class SmartDataSyncService:
     # Minimum sync interval (minutes)
     MIN_SYNC_INTERVAL = 30
     
+    # How long a should_sync decision is reused (seconds)
+    SHOULD_SYNC_CACHE_SECONDS = 60
+    
+    # Sync lock expiry (seconds), in case a worker dies while holding it
+    SYNC_LOCK_TIMEOUT = 1800
+    
+    # Shared HTTP session (keep-alive connection pool to the CBPF API)
+    _session = None
+    _session_lock = threading.Lock()
+    
     def __init__(self, auth=None):
         """Initialize the service."""
         if auth is None:
             auth = (self.DEFAULT_USER, self.DEFAULT_PASSWORD)
         self.auth = auth
+        self.session = self.get_session()
+    
+    @classmethod
+    def get_session(cls):
+        """
+        Get the process-wide requests session.
+        
+        Checksum probes and CSV downloads hit the same host, so reusing one
+        pooled session avoids a new TCP/TLS handshake per request.
+        """
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    cls._session = requests.Session()
+        return cls._session
     
     def should_sync(self, sync_type='org_mapping', force=False):
         """
@@ -53,10 +100,40 @@ class SmartDataSyncService:
         if force:
             return True, "force_sync", None
         
+        # A sync finished within MIN_SYNC_INTERVAL: its log is cached until the
+        # interval ends, so this needs neither the DB nor the API
+        last_sync = cache.get(self._last_sync_cache_key(sync_type))
+        if last_sync is not None:
+            minutes_ago = (timezone.now() - last_sync.completed_at).total_seconds() / 60
+            return False, f"too_soon ({minutes_ago:.1f} minutes ago)", last_sync
+        
+        # Reuse a recent decision so status polling does not re-probe the API
+        cache_key = self._should_sync_cache_key(sync_type)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        result = self._check_should_sync(sync_type)
+        cache.set(cache_key, result, self.SHOULD_SYNC_CACHE_SECONDS)
+        return result
+    
+    @staticmethod
+    def _should_sync_cache_key(sync_type):
+        return f'sync:should:{sync_type}'
+    
+    @staticmethod
+    def _last_sync_cache_key(sync_type):
+        return f'sync:last:{sync_type}'
+    
+    def _check_should_sync(self, sync_type):
+        """Uncached should_sync check (see should_sync)."""
         # Level 1: Check minimum time interval
         last_sync = DataSyncLog.objects.filter(
             sync_type=sync_type,
             status__in=['success', 'no_changes']
+        ).only(
+            'sync_id', 'started_at', 'completed_at', 'status',
+            'data_checksum', 'etag', 'last_modified',
         ).first()
         
         if last_sync and last_sync.completed_at:
@@ -67,7 +144,7 @@ class SmartDataSyncService:
         
         # Level 2: Check data checksum
         try:
-            current_checksum = self.get_data_checksum(sync_type)
+            current_checksum = self.get_data_checksum(sync_type, last_sync=last_sync)
             last_checksum = last_sync.data_checksum if last_sync else None
             
             if current_checksum and current_checksum == last_checksum:
@@ -79,31 +156,98 @@ class SmartDataSyncService:
         # Level 3: Sync is required
         return True, "should_sync", last_sync
     
-    def get_data_checksum(self, sync_type, sample_size=10240):
+    def get_data_checksum(self, sync_type, sample_size=None, last_sync=None):
         """
-        Get a quick data checksum (read only the first sample_size bytes).
+        Get the data checksum (see probe_data).
         
         Args:
             sync_type: Sync type
-            sample_size: Sample size in bytes
+            sample_size: Hash at most this many bytes (None = whole body)
+            last_sync: Previous DataSyncLog whose validators are sent
         
         Returns:
-            str: MD5 checksum
+            str: Hex checksum
+        """
+        checksum, _, _ = self.probe_data(sync_type, sample_size, last_sync)
+        return checksum
+    
+    def probe_data(self, sync_type, sample_size=None, last_sync=None):
+        """
+        Probe the source for changes.
+        
+        Sends the ETag / Last-Modified stored on last_sync as a conditional
+        request; a 304 reuses the stored checksum without reading any body.
+        Otherwise the checksum is derived from the response validators, or
+        from the streamed body when the server sends none.
+        
+        Args:
+            sync_type: Sync type
+            sample_size: Hash at most this many bytes (None = whole body)
+            last_sync: Previous DataSyncLog whose validators are sent
+        
+        Returns:
+            (checksum, etag, last_modified): checksum is None on error
         """
         url = self.ORG_SUMMARY_URL if sync_type == 'org_mapping' else self.GLOBAL_ORG_URL
         
+        headers = {}
+        if last_sync is not None:
+            if last_sync.etag:
+                headers['If-None-Match'] = last_sync.etag
+            if last_sync.last_modified:
+                headers['If-Modified-Since'] = last_sync.last_modified
+        
         try:
-            response = requests.get(url, auth=self.auth, stream=True, timeout=30)
-            response.raise_for_status()
-            
-            # Read only the first sample_size bytes
-            sample_data = response.raw.read(sample_size)
-            checksum = hashlib.md5(sample_data).hexdigest()
+            with self.session.get(url, auth=self.auth, headers=headers, stream=True, timeout=30) as response:
+                if response.status_code == 304 and last_sync is not None:
+                    return last_sync.data_checksum, last_sync.etag, last_sync.last_modified
+                response.raise_for_status()
+                
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+                if etag or last_modified:
+                    return _validator_checksum(etag, last_modified), etag, last_modified
+                
+                digest = _new_checksum_digest()
+                # Incremental hash of the streamed body: O(1) memory, and
+                # changes late in the file are still detected
+                remaining = sample_size
+                for chunk in response.iter_content(chunk_size=65536):
+                    if remaining is not None:
+                        chunk = chunk[:remaining]
+                        remaining -= len(chunk)
+                    digest.update(chunk)
+                    if remaining == 0:
+                        break
             
-            return checksum
+            return digest.hexdigest(), None, None
         except Exception as e:
             print(f"Error getting checksum: {e}")
-            return None
+            return None, None, None
+    
+    def fetch_rows(self, url):
+        """
+        Download and parse one CSV, fingerprinting it in the same pass.
+        
+        Args:
+            url: API URL
+        
+        Returns:
+            (rows, checksum, etag, last_modified): checksum matches what
+            probe_data computes for the same response
+        """
+        from scripts.sync_cbpf_data import read_csv_rows
+        
+        with self.session.get(url, auth=self.auth, stream=True, timeout=120) as response:
+            response.raise_for_status()
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag or last_modified:
+                return read_csv_rows(response), _validator_checksum(etag, last_modified), etag, last_modified
+            
+            digest = _new_checksum_digest()
+            rows = read_csv_rows(response, digest=digest)
+        return rows, digest.hexdigest(), None, None
     
     def sync_all(self, triggered_by='manual', force=False):
         """
@@ -123,19 +267,29 @@ class SmartDataSyncService:
             'message': ''
         }
         
-        # 1. Sync Global Organizations
-        try:
-            results['global_org'] = self.sync_global_orgs(triggered_by, force)
-        except Exception as e:
-            results['global_org'] = {'error': str(e)}
-            results['overall_status'] = 'partial_failed'
-        
-        # 2. Sync Org Mappings
-        try:
-            results['org_mapping'] = self.sync_org_mappings(triggered_by, force)
-        except Exception as e:
-            results['org_mapping'] = {'error': str(e)}
-            results['overall_status'] = 'failed'
+        # Org mapping upserts insert placeholder Global Orgs, so the two syncs
+        # must still apply in order; only the org mapping download overlaps
+        # the Global Org sync.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            mapping_rows = None
+            if self.should_sync('org_mapping', force)[0]:
+                mapping_rows = executor.submit(self.fetch_rows, self.ORG_SUMMARY_URL)
+            
+            # 1. Sync Global Organizations
+            try:
+                results['global_org'] = self.sync_global_orgs(triggered_by, force)
+            except Exception as e:
+                results['global_org'] = {'error': str(e)}
+                results['overall_status'] = 'partial_failed'
+            
+            # 2. Sync Org Mappings
+            try:
+                results['org_mapping'] = self.sync_org_mappings(
+                    triggered_by, force, prefetched_rows=mapping_rows
+                )
+            except Exception as e:
+                results['org_mapping'] = {'error': str(e)}
+                results['overall_status'] = 'failed'
         
         # 3. Clear cache if any data changed
         total_changes = 0
@@ -144,7 +298,7 @@ class SmartDataSyncService:
                 total_changes += sync_result.get('created', 0) + sync_result.get('updated', 0)
         
         if total_changes > 0:
-            cache.delete('go_summary_data')
+            # Each sync that changed rows already invalidated the view caches
             results['message'] = f'Synced successfully. {total_changes} records changed. Cache cleared.'
         else:
             results['message'] = 'Sync completed. No changes detected.'
@@ -161,17 +315,19 @@ class SmartDataSyncService:
             force=force
         )
     
-    def sync_org_mappings(self, triggered_by='manual', force=False):
+    def sync_org_mappings(self, triggered_by='manual', force=False, prefetched_rows=None):
         """Sync Organization Mappings."""
         return self._sync_data(
             sync_type='org_mapping',
             url=self.ORG_SUMMARY_URL,
             upsert_function='upsert_org_mappings',
             triggered_by=triggered_by,
-            force=force
+            force=force,
+            prefetched_rows=prefetched_rows
         )
     
-    def _sync_data(self, sync_type, url, upsert_function, triggered_by='manual', force=False):
+    def _sync_data(self, sync_type, url, upsert_function, triggered_by='manual', force=False,
+                   prefetched_rows=None):
         """
         Generic synchronization workflow.
         
@@ -181,6 +337,7 @@ class SmartDataSyncService:
             upsert_function: Upsert function name
             triggered_by: Trigger source
             force: Whether to force sync
+            prefetched_rows: Optional future already running fetch_rows(url)
         
         Returns:
             dict: Sync results
@@ -196,6 +353,22 @@ class SmartDataSyncService:
                 'message': f'Skipped: {reason}'
             }
         
+        # Only one sync per type at a time, across processes (atomic cache add)
+        lock_key = f'sync_lock:{sync_type}'
+        if not cache.add(lock_key, os.getpid(), self.SYNC_LOCK_TIMEOUT):
+            return {
+                'synced': False,
+                'reason': 'already_running',
+                'last_sync_time': last_sync.completed_at if last_sync else None,
+                'message': 'Skipped: already_running'
+            }
+        try:
+            return self._run_sync(sync_type, url, upsert_function, triggered_by, prefetched_rows)
+        finally:
+            cache.delete(lock_key)
+    
+    def _run_sync(self, sync_type, url, upsert_function, triggered_by, prefetched_rows=None):
+        """Fetch, upsert and log one sync run (caller holds the sync lock)."""
         # Create sync log
         log = DataSyncLog.objects.create(
             sync_type=sync_type,
@@ -205,29 +378,43 @@ class SmartDataSyncService:
         
         try:
             # Import sync helpers
-            from scripts.sync_cbpf_data import fetch_csv_rows, upsert_global_orgs, upsert_org_mappings
+            from scripts.sync_cbpf_data import upsert_global_orgs, upsert_org_mappings
             
-            # Fetch data
-            rows = fetch_csv_rows(url, auth=self.auth, timeout=120)
-            log.records_fetched = len(rows)
-            
-            # Execute upsert
-            if upsert_function == 'upsert_global_orgs':
-                created, updated = upsert_global_orgs(rows)
-                total = len(rows)
+            # Fetch and fingerprint the data in one download, before opening
+            # the transaction, so no network I/O happens while it is held
+            if prefetched_rows is not None:
+                fetched = prefetched_rows.result()
             else:
-                total, created, updated = upsert_org_mappings(rows)
-            
-            # Calculate data checksum
-            checksum = self.get_data_checksum(sync_type)
+                fetched = self.fetch_rows(url)
+            rows, checksum, etag, last_modified = fetched
             
-            # Update sync log
-            log.records_created = created
-            log.records_updated = updated
-            log.data_checksum = checksum
-            log.status = 'success' if (created > 0 or updated > 0) else 'no_changes'
-            log.completed_at = timezone.now()
-            log.save()
+            # Upserts and the final log update commit (or roll back) together
+            with transaction.atomic():
+                log.records_fetched = len(rows)
+                
+                # Execute upsert
+                if upsert_function == 'upsert_global_orgs':
+                    created, updated = upsert_global_orgs(rows)
+                    total = len(rows)
+                else:
+                    total, created, updated = upsert_org_mappings(rows)
+                
+                # Update sync log
+                log.records_created = created
+                log.records_updated = updated
+                log.data_checksum = checksum
+                log.etag = etag
+                log.last_modified = last_modified
+                log.status = 'success' if (created > 0 or updated > 0) else 'no_changes'
+                log.completed_at = timezone.now()
+                log.save()
+            cache.delete(self._should_sync_cache_key(sync_type))
+            cache.set(self._last_sync_cache_key(sync_type), log, self.MIN_SYNC_INTERVAL * 60)
+            if created > 0 or updated > 0:
+                # Every sync path (sync_all or a single type) invalidates the
+                # view caches; go_summary has its own key, the rest are versioned
+                cache.delete('go_summary_data')
+                bump_data_version()
             
             return {
                 'synced': True,
@@ -245,6 +432,7 @@ class SmartDataSyncService:
             log.error_message = str(e)
             log.completed_at = timezone.now()
             log.save()
+            cache.delete(self._should_sync_cache_key(sync_type))
             
             raise Exception(f"Sync failed: {str(e)}")
     
@@ -262,16 +450,32 @@ class SmartDataSyncService:
         if sync_type:
             query = query.filter(sync_type=sync_type)
         
-        last_sync = query.filter(status__in=['success', 'no_changes']).first()
-        last_attempt = query.first()
-        running_sync = query.filter(status='running').first()
+        # Narrow rows for the status card; error_message (TEXT) is only
+        # loaded when the last attempt failed
+        status_fields = (
+            'sync_id', 'started_at', 'completed_at', 'status',
+            'records_created', 'records_updated',
+        )
+        last_attempt = query.only(*status_fields).first()
+        if last_attempt and last_attempt.status in ('success', 'no_changes'):
+            last_sync = last_attempt
+        else:
+            last_sync = query.filter(
+                status__in=['success', 'no_changes']
+            ).only(*status_fields).first()
         
-        # Aggregate sync stats from the last 24 hours
+        # Running flag and last-24h stats in a single aggregate query
         one_day_ago = timezone.now() - timedelta(days=1)
-        recent_syncs = query.filter(started_at__gte=one_day_ago)
+        recent = Q(started_at__gte=one_day_ago)
+        stats = query.aggregate(
+            running=Count('pk', filter=Q(status='running')),
+            total=Count('pk', filter=recent),
+            successful=Count('pk', filter=recent & Q(status__in=['success', 'no_changes'])),
+            failed=Count('pk', filter=recent & Q(status='failed')),
+        )
         
         return {
-            'is_syncing': running_sync is not None,
+            'is_syncing': stats['running'] > 0,
             'last_sync': {
                 'time': last_sync.completed_at if last_sync else None,
                 'status': last_sync.status if last_sync else None,
@@ -285,9 +489,9 @@ class SmartDataSyncService:
                 'error': last_attempt.error_message if last_attempt and last_attempt.status == 'failed' else None,
             } if last_attempt else None,
             'recent_24h': {
-                'total_syncs': recent_syncs.count(),
-                'successful': recent_syncs.filter(status__in=['success', 'no_changes']).count(),
-                'failed': recent_syncs.filter(status='failed').count(),
+                'total_syncs': stats['total'],
+                'successful': stats['successful'],
+                'failed': stats['failed'],
             }
         }
     
@@ -306,21 +510,50 @@ class SmartDataSyncService:
         if sync_type:
             query = query.filter(sync_type=sync_type)
         
-        logs = query[:limit]
+        # Plain dicts, and error_message only read for failed runs; streamed
+        # in chunks instead of filling the queryset result cache
+        logs = query.annotate(
+            failure_message=Case(
+                When(status='failed', then=F('error_message')),
+                default=Value(None),
+                output_field=TextField(),
+            ),
+        ).values(
+            'sync_id', 'sync_type', 'started_at', 'completed_at', 'status',
+            'records_fetched', 'records_created', 'records_updated',
+            'triggered_by', 'failure_message',
+        )[:limit].iterator(chunk_size=500)
         
         return [
             {
-                'sync_id': log.sync_id,
-                'sync_type': log.sync_type,
-                'started_at': log.started_at,
-                'completed_at': log.completed_at,
-                'status': log.status,
-                'records_fetched': log.records_fetched,
-                'records_created': log.records_created,
-                'records_updated': log.records_updated,
-                'duration_seconds': log.duration_seconds,
-                'triggered_by': log.triggered_by,
-                'error_message': log.error_message if log.status == 'failed' else None,
+                'sync_id': log['sync_id'],
+                'sync_type': log['sync_type'],
+                'started_at': log['started_at'],
+                'completed_at': log['completed_at'],
+                'status': log['status'],
+                'records_fetched': log['records_fetched'],
+                'records_created': log['records_created'],
+                'records_updated': log['records_updated'],
+                'duration_seconds': (
+                    (log['completed_at'] - log['started_at']).total_seconds()
+                    if log['completed_at'] and log['started_at'] else None
+                ),
+                'triggered_by': log['triggered_by'],
+                'error_message': log['failure_message'],
             }
             for log in logs
         ]
+
+
+_default_service = None
+_default_service_lock = threading.Lock()
+
+
+def get_sync_service():
+    """Get the shared SmartDataSyncService (default credentials)."""
+    global _default_service
+    if _default_service is None:
+        with _default_service_lock:
+            if _default_service is None:
+                _default_service = SmartDataSyncService()
+    return _default_service
@@ -10,8 +10,9 @@ import json
 
 
 from orgnizations.models import GlobalOrganization, GoSimilarity, OrgMapping, DataSyncLog, MergeDecision
+from .cache_version import bump_data_version, versioned_key
 from .serializers import GlobalOrganizationSerializer
-from .sync_service import SmartDataSyncService
+from .sync_service import get_sync_service
 
 @api_view(['GET'])
 def go_list(request):
@@ -23,7 +24,9 @@ def go_list(request):
 @api_view(["GET"])
 def go_summary(request):
     from django.core.cache import cache
-    from django.db.models import Count
+    from django.db.models import Count, IntegerField, Value
+    from django.db.models.functions import Coalesce
+    from collections import defaultdict
     from organization_knowledge_base import get_recommendation_score
     import subprocess
     import os
@@ -47,31 +50,18 @@ def go_summary(request):
     
     # Only update usage_count and recalculate similarities when force_refresh=true
     if force_refresh:
-        # Also invalidate mapping dashboard cache
-        cache.delete('mapping_dashboard_data')
-        
-        # Calculate usage count for each GO from org_mapping table
-        usage_counts = (
+        # Recalculate usage_count for every GO in one UPDATE; GOs without
+        # mappings get 0 through the Coalesce
+        mapping_counts = (
             OrgMapping.objects
+            .filter(global_org_id=OuterRef('global_org_id'))
             .values('global_org_id')
             .annotate(count=Count('id'))
+            .values('count')
+        )
+        GlobalOrganization.objects.update(
+            usage_count=Coalesce(Subquery(mapping_counts, output_field=IntegerField()), Value(0))
         )
-        
-        # Update usage_count in global_organization table
-        for item in usage_counts:
-            GlobalOrganization.objects.filter(
-                global_org_id=item['global_org_id']
-            ).update(usage_count=item['count'])
-        
-        # Set usage_count to 0 for GOs with no mappings
-        go_ids_with_mappings = set(item['global_org_id'] for item in usage_counts)
-        all_go_ids = set(GlobalOrganization.objects.values_list('global_org_id', flat=True))
-        go_ids_without_mappings = all_go_ids - go_ids_with_mappings
-        
-        if go_ids_without_mappings:
-            GlobalOrganization.objects.filter(
-                global_org_id__in=go_ids_without_mappings
-            ).update(usage_count=0)
         
         # Run similarity calculation and wait for completion
         try:
@@ -100,42 +90,89 @@ def go_summary(request):
         except Exception as e:
             # Log the error but don't fail the request
             print(f"Warning: Could not start similarity calculation: {e}")
+        
+        # usage_count and go_similarity changed: drop the versioned view caches
+        bump_data_version()
     
     # Build grouped data structure - Read from pre-calculated go_similarity table
-    # Fetch all similarities from database
-    all_similarities = GoSimilarity.objects.select_related(
-        'source_global_org', 'target_global_org'
-    ).all()
+    # Fetch all similarities from database: only ids and score, as streamed
+    # tuples without joining the two GO tables
+    all_similarities = GoSimilarity.objects.values_list(
+        'source_global_org_id', 'target_global_org_id', 'similarity_percent'
+    ).iterator(chunk_size=5000)
     
-    # Build similarity graph using Union-Find
-    go_groups = {}  # {go_id: group_id}
-    groups = {}     # {group_id: set of go_ids}
-    next_group_id = 1
+    # Build similarity graph using Union-Find (union by rank + path compression)
+    parent = {}     # {go_id: parent go_id}
+    rank = {}       # {root go_id: tree height bound}
+    root_max = {}   # {root go_id: max similarity_percent within the set}
+    
+    def find(go_id):
+        root = go_id
+        while parent[root] != root:
+            root = parent[root]
+        while parent[go_id] != root:
+            parent[go_id], go_id = root, parent[go_id]
+        return root
     
-    for similarity in all_similarities:
-        source_id = similarity.source_global_org_id
-        target_id = similarity.target_global_org_id
+    for source_id, target_id, similarity_percent in all_similarities:
+        for go_id in (source_id, target_id):
+            if go_id not in parent:
+                parent[go_id] = go_id
+                rank[go_id] = 0
         
-        source_group = go_groups.get(source_id)
-        target_group = go_groups.get(target_id)
+        source_root = find(source_id)
+        target_root = find(target_id)
+        if source_root != target_root:
+            if rank[source_root] < rank[target_root]:
+                source_root, target_root = target_root, source_root
+            parent[target_root] = source_root
+            if rank[source_root] == rank[target_root]:
+                rank[source_root] += 1
+            if target_root in root_max:
+                root_max[source_root] = max(root_max.get(source_root, 0), root_max.pop(target_root))
         
-        if source_group is None and target_group is None:
-            go_groups[source_id] = next_group_id
-            go_groups[target_id] = next_group_id
-            groups[next_group_id] = {source_id, target_id}
-            next_group_id += 1
-        elif source_group is None:
-            go_groups[source_id] = target_group
-            groups[target_group].add(source_id)
-        elif target_group is None:
-            go_groups[target_id] = source_group
-            groups[source_group].add(target_id)
-        elif source_group != target_group:
-            # Merge groups
-            for go_id in groups[target_group]:
-                go_groups[go_id] = source_group
-                groups[source_group].add(go_id)
-            del groups[target_group]
+        # Both ends of every edge are in the same set, so its max is
+        # tracked here instead of re-querying go_similarity per member
+        if similarity_percent is not None:
+            root_max[source_root] = max(root_max.get(source_root, 0), float(similarity_percent))
+    
+    # Materialize groups, numbered in order of first appearance
+    groups = {}     # {group_id: set of go_ids}
+    group_max = {}  # {group_id: max similarity_percent within the group}
+    root_group = {}
+    for go_id in parent:
+        root = find(go_id)
+        group_id = root_group.get(root)
+        if group_id is None:
+            group_id = root_group[root] = len(root_group) + 1
+            groups[group_id] = set()
+            group_max[group_id] = root_max.get(root, 0)
+        groups[group_id].add(go_id)
+    
+    # Every GO ends up in a group or in the unique list, so load the first
+    # 20 instance orgs of each in one query instead of one query per GO
+    instance_orgs_by_go = defaultdict(list)
+    all_mappings = OrgMapping.objects.order_by('global_org_id', 'id').values(
+        'global_org_id',
+        'instance_org_id',
+        'instance_org_name',
+        'instance_org_acronym',
+        'instance_org_type',
+        'fund_name',
+        'match_percent'
+    )
+    for m in all_mappings:
+        instance_orgs = instance_orgs_by_go[m.pop('global_org_id')]
+        if len(instance_orgs) < 20:  # Limit to 20 for performance
+            instance_orgs.append(m)
+    
+    # All GOs once, shared by the duplicate groups and the unique list
+    gos_by_id = {
+        go.global_org_id: go
+        for go in GlobalOrganization.objects.order_by('global_org_id').only(
+            'global_org_id', 'global_org_name', 'global_acronym', 'usage_count'
+        )
+    }
     
     # Build duplicate groups
     duplicate_groups = []
@@ -143,19 +180,9 @@ def go_summary(request):
         if len(go_ids) < 2:
             continue
         
-        go_list = GlobalOrganization.objects.filter(global_org_id__in=go_ids)
+        go_list = [gos_by_id[go_id] for go_id in sorted(go_ids) if go_id in gos_by_id]
         
-        # Get max similarity within group from database
-        max_similarity = 0
-        for go_id in go_ids:
-            similarities_in_group = GoSimilarity.objects.filter(
-                source_global_org_id=go_id,
-                target_global_org_id__in=go_ids
-            ).values_list('similarity_percent', flat=True)
-            if similarities_in_group:
-                group_max = max(float(s) for s in similarities_in_group if s is not None)
-                if group_max > max_similarity:
-                    max_similarity = group_max
+        max_similarity = group_max.get(group_id, 0)
         
         members = []
         total_instances = 0
@@ -164,25 +191,13 @@ def go_summary(request):
             usage = go.usage_count or 0
             total_instances += usage
             
-            # Get instance organizations for this GO
-            instance_orgs = OrgMapping.objects.filter(
-                global_org_id=go.global_org_id
-            ).values(
-                'instance_org_id',
-                'instance_org_name',
-                'instance_org_acronym',
-                'instance_org_type',
-                'fund_name',
-                'match_percent'
-            )[:20]  # Limit to 20 for performance
-            
             members.append({
                 "global_org_id": go.global_org_id,
                 "global_org_name": go.global_org_name,
                 "global_org_acronym": go.global_acronym or "",
                 "usage_count": usage,
                 "name_length": len(go.global_org_name) if go.global_org_name else 0,
-                "instance_organizations": list(instance_orgs)
+                "instance_organizations": instance_orgs_by_go.get(go.global_org_id, [])
             })
         
         # Recommend master using knowledge base + usage count + name length
@@ -237,28 +252,14 @@ def go_summary(request):
         grouped_go_ids.update(m["global_org_id"] for m in group["members"])
     
     unique_organizations = []
-    all_gos = GlobalOrganization.objects.all()
-    
-    for go in all_gos:
+    for go in gos_by_id.values():
         if go.global_org_id not in grouped_go_ids:
-            # Get instance organizations for this unique GO
-            instance_orgs = OrgMapping.objects.filter(
-                global_org_id=go.global_org_id
-            ).values(
-                'instance_org_id',
-                'instance_org_name',
-                'instance_org_acronym',
-                'instance_org_type',
-                'fund_name',
-                'match_percent'
-            )[:20]  # Limit to 20 for performance
-            
             unique_organizations.append({
                 "global_org_id": go.global_org_id,
                 "global_org_name": go.global_org_name,
                 "global_org_acronym": go.global_acronym or "",
                 "usage_count": go.usage_count or 0,
-                "instance_organizations": list(instance_orgs)
+                "instance_organizations": instance_orgs_by_go.get(go.global_org_id, [])
             })
     
     # Sort unique by usage count
@@ -268,7 +269,7 @@ def go_summary(request):
         "duplicate_groups": duplicate_groups,
         "unique_organizations": unique_organizations,
         "summary": {
-            "total_organizations": len(all_gos),
+            "total_organizations": len(gos_by_id),
             "duplicate_groups_count": len(duplicate_groups),
             "unique_count": len(unique_organizations)
         }
@@ -290,6 +291,13 @@ def go_detail(request, go_id: int):
       "similar_gos": [{"go_id": 2, "go_name": "yyy", "similarity": 90.12, "mapping_count": 123}, ...]
     }
     """
+    from django.core.cache import cache
+    
+    cache_key = versioned_key('go_detail', go_id)
+    cached = cache.get(cache_key)
+    if cached:
+        return Response(cached)
+    
     go = get_object_or_404(GlobalOrganization, global_org_id=go_id)
 
     similarities = (
@@ -311,12 +319,12 @@ def go_detail(request, go_id: int):
             }
         )
 
-    return Response(
-        {
-            "go_info": {"id": go.global_org_id, "name": go.global_org_name},
-            "similar_gos": similar_gos,
-        }
-    )
+    result = {
+        "go_info": {"id": go.global_org_id, "name": go.global_org_name},
+        "similar_gos": similar_gos,
+    }
+    cache.set(cache_key, result, 3600)
+    return Response(result)
 
 
 @api_view(["GET"])
@@ -330,22 +338,25 @@ def org_mapping(request, go_id: int):
     """
     go = get_object_or_404(GlobalOrganization, global_org_id=go_id)
 
-    mappings_qs = OrgMapping.objects.filter(global_org_id=go_id).order_by("id")
-    
-    mappings = []
-    for mapping in mappings_qs:
-        mappings.append({
-            "instance_org_id": mapping.instance_org_id,
-            "instance_org_name": mapping.instance_org_name,
-            "instance_org_acronym": mapping.instance_org_acronym,
-            "instance_org_type": mapping.instance_org_type,
-            "parent_instance_org_id": mapping.parent_instance_org_id,
-            "fund_id": mapping.fund_id,
-            "fund_name": mapping.fund_name,
-            "match_percent": float(mapping.match_percent) if mapping.match_percent is not None else None,
-            "risk_level": mapping.risk_level,
-            "status": mapping.status,
-        })
+    # Plain dicts straight from the query (same fields and order as the
+    # dashboard), no model instances
+    mappings = list(
+        OrgMapping.objects.filter(global_org_id=go_id).order_by("id").values(
+            'instance_org_id',
+            'instance_org_name',
+            'instance_org_acronym',
+            'instance_org_type',
+            'parent_instance_org_id',
+            'fund_id',
+            'fund_name',
+            'match_percent',
+            'risk_level',
+            'status',
+        )
+    )
+    for m in mappings:
+        if m['match_percent'] is not None:
+            m['match_percent'] = float(m['match_percent'])
 
     return Response(
         {
@@ -367,7 +378,7 @@ def mapping_dashboard(request):
     from django.core.cache import cache
     from collections import defaultdict
     
-    cache_key = 'mapping_dashboard_data'
+    cache_key = versioned_key('mapping_dashboard')
     cached = cache.get(cache_key)
     if cached:
         return Response(cached)
@@ -678,7 +689,7 @@ def sync_status(request):
     """
     sync_type = request.GET.get('sync_type', None)
     
-    service = SmartDataSyncService()
+    service = get_sync_service()
     status_info = service.get_sync_status(sync_type)
     
     return Response(status_info)
@@ -694,7 +705,7 @@ def sync_history(request):
     limit = int(request.GET.get('limit', 20))
     sync_type = request.GET.get('sync_type', None)
     
-    service = SmartDataSyncService()
+    service = get_sync_service()
     history = service.get_sync_history(limit=limit, sync_type=sync_type)
     
     return Response({
@@ -727,7 +738,7 @@ def trigger_sync(request):
         sync_type = request.data.get('sync_type', 'full')
         force = request.data.get('force', False)
         
-        service = SmartDataSyncService()
+        service = get_sync_service()
         
         if sync_type == 'full':
             results = service.sync_all(triggered_by='manual', force=force)
@@ -793,7 +804,7 @@ def check_for_updates(request):
     """
     sync_type = request.GET.get('sync_type', 'org_mapping')
     
-    service = SmartDataSyncService()
+    service = get_sync_service()
     should_sync, reason, last_sync = service.should_sync(sync_type, force=False)
     
     return Response({
@@ -1053,8 +1064,7 @@ def update_merge_decision_status(request, decision_id):
             )
             mapping_updated = updated_count > 0
             if mapping_updated:
-                from django.core.cache import cache
-                cache.delete('mapping_dashboard_data')
+                bump_data_version()
             
         elif new_status == 'cancelled':
             decision.execution_notes = request.data.get('execution_notes', 'Cancelled by user')
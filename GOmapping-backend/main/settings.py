@@ -141,4 +141,26 @@ STATIC_URL = "static/"
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 100,  # return 100 records
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# The local-memory cache is per process: with several workers, point this at a
+# shared backend (e.g. django.core.cache.backends.redis.RedisCache) so the
+# post-sync invalidation and the sync lock reach every worker.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+
+# Data sync change-detection digest: "md5" or "xxh3_128" (faster, needs the
+# xxhash package). Switching makes the next check re-sync once.
+SYNC_CHECKSUM_ALGORITHM = "md5"
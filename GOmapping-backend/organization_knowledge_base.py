@@ -3,6 +3,8 @@ Global Organization Knowledge Base
 Maintains standard names and country presence for known international organizations
 """
 
+from functools import lru_cache
+
 # Standard Global Organizations with their known presence
 KNOWN_ORGANIZATIONS = {
     "save the children": {
@@ -149,10 +151,13 @@ def normalize_for_kb(name):
     return name.strip()
 
 
+@lru_cache(maxsize=8192)
 def find_standard_name(org_name):
     """
     Find the standard name for an organization
     Returns: (standard_name, priority, is_match) or (None, 0, False)
+    Cached per name: the KB is static, and the partial-match scan is the
+    expensive part of get_recommendation_score.
     """
     if not org_name:
         return None, 0, False
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-15 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orgnizations", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datasynclog",
+            name="etag",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="datasynclog",
+            name="last_modified",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-15 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orgnizations", "0002_datasynclog_etag_last_modified"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="datasynclog",
+            index=models.Index(
+                fields=["sync_type", "status", "-started_at"], name="synclog_hot_idx"
+            ),
+        ),
+    ]
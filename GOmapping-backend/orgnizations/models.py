@@ -85,6 +85,10 @@ class DataSyncLog(models.Model):
     # Data checksum (used for change detection)
     data_checksum = models.CharField(max_length=64, null=True, blank=True)
     
+    # HTTP validators of the source at sync time (conditional change checks)
+    etag = models.CharField(max_length=255, null=True, blank=True)
+    last_modified = models.CharField(max_length=64, null=True, blank=True)
+    
     # Status and error details
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
     error_message = models.TextField(blank=True)
@@ -99,6 +103,8 @@ class DataSyncLog(models.Model):
             models.Index(fields=['-started_at']),
             models.Index(fields=['sync_type', '-started_at']),
             models.Index(fields=['status']),
+            # "Last successful sync of a type": filter on both, newest first
+            models.Index(fields=['sync_type', 'status', '-started_at'], name='synclog_hot_idx'),
         ]
     
     def __str__(self):
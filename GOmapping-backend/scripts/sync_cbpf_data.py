@@ -1,10 +1,10 @@
 import argparse
-import csv
 import os
 import sys
-from io import StringIO
+from io import BufferedReader, RawIOBase, TextIOWrapper
 from pathlib import Path
 
+import pandas as pd
 import requests
 
 
@@ -69,12 +69,47 @@ def calculate_match_percent(instance_org_name, global_org_name):
     return Decimal(str(match_percent))
 
 
-def fetch_csv_rows(url, auth=None, timeout=120):
-    resp = requests.get(url, auth=auth, timeout=timeout)
-    resp.raise_for_status()
-    text = resp.content.decode("utf-8-sig", errors="replace")
-    reader = csv.DictReader(StringIO(text))
-    return list(reader)
+class HashingReader(RawIOBase):
+    """Readable stream that feeds every byte it returns to digest.update."""
+
+    def __init__(self, raw, digest):
+        self._raw = raw
+        self._digest = digest
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._raw.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self._digest.update(data)
+        return size
+
+
+def read_csv_rows(resp, digest=None):
+    # Parse straight from the socket instead of buffering the body and its
+    # decoded copy; gunzip transparently and report EOF, not "closed"
+    resp.raw.decode_content = True
+    resp.raw.auto_close = False
+    stream = resp.raw
+    if digest is not None:
+        # Fingerprint the decoded body while it is parsed, no second read
+        stream = BufferedReader(HashingReader(resp.raw, digest))
+    text = TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    # pandas' C parser instead of csv.DictReader; keep every value as a string
+    # (no NaN conversion) so parse_int/parse_str see the same input as before
+    try:
+        frame = pd.read_csv(text, dtype=str, na_filter=False).fillna("")
+    except pd.errors.EmptyDataError:
+        return []
+    return frame.to_dict("records")
+
+
+def fetch_csv_rows(url, auth=None, timeout=120, session=None):
+    with (session or requests).get(url, auth=auth, stream=True, timeout=timeout) as resp:
+        resp.raise_for_status()
+        return read_csv_rows(resp)
 
 
 def chunked(items, size):
@@ -83,7 +118,7 @@ def chunked(items, size):
 
 
 def upsert_global_orgs(rows, batch_size=1000):
-    from django.db import connection
+    from django.db import connection, transaction
     
     org_data = {}
     skipped_rows = []  
@@ -121,39 +156,43 @@ def upsert_global_orgs(rows, batch_size=1000):
     if not org_data:
         return 0, 0
 
-    # Use raw SQL to upsert into both tables
-    created_count = 0
-    updated_count = 0
-    
-    cursor = connection.cursor()
-    
+    # Look up existing IDs in global_organization_mock (the table with FK constraint)
+    # with a few IN queries instead of one SELECT per row
+    existing_ids = set()
+    with connection.cursor() as cursor:
+        for id_chunk in chunked(list(org_data), 2000):
+            placeholders = ",".join(["%s"] * len(id_chunk))
+            cursor.execute(
+                f"SELECT global_org_id FROM global_organization_mock WHERE global_org_id IN ({placeholders})",
+                id_chunk,
+            )
+            existing_ids.update(row[0] for row in cursor.fetchall())
+
+    to_update = []
+    to_insert = []
     for go_id, data in org_data.items():
-        # Check if exists in global_organization_mock (the table with FK constraint)
-        cursor.execute(
-            "SELECT global_org_id FROM global_organization_mock WHERE global_org_id = %s",
-            [go_id]
-        )
-        exists = cursor.fetchone() is not None
-        
-        if exists:
-            # Update both tables
-            for table in ['global_organization', 'global_organization_mock']:
-                cursor.execute(f"""
+        if go_id in existing_ids:
+            to_update.append([data["global_org_name"], data["global_acronym"], go_id])
+        else:
+            to_insert.append([go_id, data["global_org_name"], data["global_acronym"]])
+
+    # Upsert into both tables with batched executemany in one transaction
+    with transaction.atomic(savepoint=False), connection.cursor() as cursor:
+        for table in ['global_organization', 'global_organization_mock']:
+            for batch in chunked(to_update, batch_size):
+                cursor.executemany(f"""
                     UPDATE {table}
                     SET global_org_name = %s, global_acronym = %s
                     WHERE global_org_id = %s
-                """, [data["global_org_name"], data["global_acronym"], go_id])
-            updated_count += 1
-        else:
-            # Insert into both tables
-            for table in ['global_organization', 'global_organization_mock']:
-                cursor.execute(f"""
+                """, batch)
+            for batch in chunked(to_insert, batch_size):
+                cursor.executemany(f"""
                     INSERT INTO {table} (global_org_id, global_org_name, global_acronym, usage_count)
                     VALUES (%s, %s, %s, 0)
-                """, [go_id, data["global_org_name"], data["global_acronym"]])
-            created_count += 1
-    
-    connection.commit()
+                """, batch)
+
+    created_count = len(to_insert)
+    updated_count = len(to_update)
     
     # Print skipped rows
     if skipped_rows:
@@ -229,7 +268,7 @@ def upsert_org_mappings(rows, batch_size=1000):
         return 0, 0, 0
 
     # Ensure all referenced global orgs exist in both tables
-    from django.db import connection
+    from django.db import connection, transaction
     cursor = connection.cursor()
     
     if global_ids:
@@ -242,21 +281,18 @@ def upsert_org_mappings(rows, batch_size=1000):
         cursor.execute(f"SELECT global_org_id FROM global_organization_mock WHERE global_org_id IN ({ids_str})")
         existing_in_mock = set(row[0] for row in cursor.fetchall())
         
-        # Insert only where missing
-        for go_id in global_ids:
-            if go_id not in existing_in_main:
-                cursor.execute("""
-                    INSERT INTO global_organization (global_org_id, global_org_name, global_acronym, usage_count)
-                    VALUES (%s, %s, NULL, 0)
-                """, [go_id, f"Global Org {go_id}"])
-            
-            if go_id not in existing_in_mock:
-                cursor.execute("""
-                    INSERT INTO global_organization_mock (global_org_id, global_org_name, global_acronym, usage_count)
-                    VALUES (%s, %s, NULL, 0)
-                """, [go_id, f"Global Org {go_id}"])
-        
-        connection.commit()
+        # Insert only where missing, one executemany per table
+        with transaction.atomic(savepoint=False):
+            for table, existing_ids in [
+                ('global_organization', existing_in_main),
+                ('global_organization_mock', existing_in_mock),
+            ]:
+                missing = [[go_id, f"Global Org {go_id}"] for go_id in global_ids if go_id not in existing_ids]
+                for batch in chunked(missing, batch_size):
+                    cursor.executemany(f"""
+                        INSERT INTO {table} (global_org_id, global_org_name, global_acronym, usage_count)
+                        VALUES (%s, %s, NULL, 0)
+                    """, batch)
 
     # Fetch Global Org names for match_percent calculation
     global_org_names = {}